@@ -0,0 +1,127 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+
+
+class LocalTTLCache:
+    """Ограниченный LRU-кэш процесса с временем жизни записей."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_tokens = LocalTTLCache(
+    settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_LOCAL_TTL)
+
+
+def shared_cache():
+    """
+    Общий кэш для всех воркеров. LocMemCache живет внутри процесса
+    и не позволяет сбросить токен в других воркерах, поэтому не
+    используется.
+    """
+    cache = caches[settings.TOKEN_CACHE_ALIAS]
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+def token_cache_key(key):
+    return 'auth_token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_tokens(keys):
+    """Сбрасывает токены из локального и общего кэша."""
+    cache_keys = [token_cache_key(key) for key in keys]
+    for cache_key in cache_keys:
+        local_tokens.delete(cache_key)
+    cache = shared_cache()
+    if cache is not None and cache_keys:
+        cache.delete_many(cache_keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кэшированием токена и пользователя:
+    сначала LRU процесса, затем общий кэш, затем БД.
+    Кэш сбрасывается сигналами при выходе, смене пароля
+    и любом изменении пользователя (api.signals), но LRU других
+    процессов хранит копию до TOKEN_CACHE_LOCAL_TTL. Поэтому
+    изменяющие запросы, которые могут сохранить request.user целиком
+    (аватар, смена пароля), получают пользователя из основной БД.
+    """
+
+    from_cache = False
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if (result is None or not self.from_cache
+                or request.method in SAFE_METHODS):
+            return result
+        user, token = result
+        user = get_user_model().objects.using('default').filter(
+            pk=user.pk, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        token.user = user
+        return user, token
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        payload = local_tokens.get(cache_key)
+        cache = shared_cache()
+        if payload is None and cache is not None:
+            payload = cache.get(cache_key)
+            if payload is not None:
+                local_tokens.set(cache_key, payload)
+        if payload is not None:
+            # Каждый запрос получает собственную копию пользователя.
+            self.from_cache = True
+            token = pickle.loads(payload)
+            return token.user, token
+
+        user, token = super().authenticate_credentials(key)
+        payload = pickle.dumps(token)
+        local_tokens.set(cache_key, payload)
+        if cache is not None:
+            cache.set(cache_key, payload, settings.TOKEN_CACHE_TTL)
+        return user, token
@@ -0,0 +1,31 @@
+"""
+Микробенчмарки для команды run_benchmarks.
+
+Бенчмарки регистрируются декоратором benchmark (api.benchmarks.base)
+в модулях пакета, по модулю на часть API. load_benchmarks импортирует
+модули из MODULES и возвращает реестр.
+"""
+from importlib import import_module
+
+from api.benchmarks.base import BENCHMARKS
+
+MODULES = (
+    'serializers',
+    'shopping_list',
+    'short_links',
+    'database',
+    'renderers',
+    'compression',
+    'throttling',
+    'authentication',
+    'similarity',
+    'pantry',
+    'feed',
+    'popularity',
+)
+
+
+def load_benchmarks():
+    for module in MODULES:
+        import_module(f'api.benchmarks.{module}')
+    return BENCHMARKS
@@ -0,0 +1,24 @@
+"""Аутентификация по токену: БД и кэш."""
+from api.authentication import CachedTokenAuthentication, local_tokens
+from api.benchmarks.base import benchmark
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+def token_auth_benchmark(authentication_class):
+    def setup(options):
+        user = User.objects.order_by('id').first()
+        key = Token.objects.get_or_create(user=user)[0].key
+        authentication = authentication_class()
+        local_tokens.clear()
+        authentication.authenticate_credentials(key)
+        return lambda: authentication.authenticate_credentials(key)
+    return setup
+
+
+benchmark('token_auth_db')(token_auth_benchmark(TokenAuthentication))
+benchmark('token_auth_cached')(
+    token_auth_benchmark(CachedTokenAuthentication))
@@ -0,0 +1,108 @@
+"""Реестр бенчмарков, их запуск и общие данные для измерений."""
+import statistics
+import time
+from contextlib import ExitStack
+
+from api.metrics import QueryCounter
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import BooleanField, Count, Exists, OuterRef, Value
+from django.test import RequestFactory
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+
+User = get_user_model()
+
+BENCHMARKS = {}
+
+
+def benchmark(name, atomic=True):
+    """
+    Регистрирует бенчмарк.
+    Функция получает параметры запуска, подготавливает данные
+    и возвращает вызываемый объект, время выполнения которого измеряется.
+    С atomic=False бенчмарк выполняется вне откатываемой транзакции.
+    """
+    def decorator(func):
+        func.atomic = atomic
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def make_request(user=None, path='/api/recipes/', **params):
+    """Запрос-заглушка для контекста сериализаторов."""
+    request = RequestFactory().get(path, params)
+    request.user = user
+    return request
+
+
+def annotated_recipes(user):
+    """Queryset рецептов в том виде, в каком его строит RecipeViewSet."""
+    if user is None or not user.is_authenticated:
+        return Recipe.objects.annotate(
+            is_favorited=Value(False, output_field=BooleanField()),
+            is_in_shopping_cart=Value(False, output_field=BooleanField())
+        )
+    return Recipe.objects.annotate(
+        is_favorited=Exists(FavoriteRecipe.objects.filter(
+            user=user, recipe=OuterRef('pk'))),
+        is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+            user=user, recipe=OuterRef('pk')))
+    )
+
+
+def busiest_user(relation):
+    """Пользователь с наибольшим числом связанных объектов."""
+    return User.objects.annotate(
+        relation_count=Count(relation)
+    ).order_by('-relation_count').first()
+
+
+def run_benchmark(func, repeat, options):
+    """
+    Выполняет бенчмарк repeat раз в откатываемой транзакции.
+    Возвращает время (мс), количество SQL-запросов и дополнительные
+    показатели из атрибута extra измеряемой функции.
+    """
+    timings = []
+    queries = 0
+    extra = {}
+    for _ in range(repeat):
+        with ExitStack() as stack:
+            if func.atomic:
+                stack.enter_context(transaction.atomic())
+            run = func(options)
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = counter.count
+            extra = getattr(run, 'extra', {})
+            if func.atomic:
+                transaction.set_rollback(True)
+    return {
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'queries': queries,
+        'repeat': repeat,
+        **extra,
+    }
+
+
+def compare_results(current, baseline, threshold):
+    """Возвращает список регрессий относительно предыдущего запуска."""
+    regressions = []
+    for name, result in current.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['median_ms'] > previous['median_ms'] * (1 + threshold):
+            regressions.append(
+                f'{name}: {previous["median_ms"]} -> '
+                f'{result["median_ms"]} мс')
+        if result['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: {previous["queries"]} -> '
+                f'{result["queries"]} SQL-запросов')
+    return regressions
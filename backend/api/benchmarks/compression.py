@@ -0,0 +1,33 @@
+"""Сжатие ответов gzip и brotli."""
+from api.benchmarks.base import benchmark
+from api.benchmarks.renderers import ingredients_payload, recipe_page_payload
+from api.compression import brotli, brotli_compress, gzip_compress
+from api.renderers import ORJSONRenderer
+
+
+def compression_benchmark(compress, level, payload):
+    """Время сжатия тела ответа и экономия байт."""
+    def setup(options):
+        content = ORJSONRenderer().render(payload())
+        compressed = compress(content, level)
+
+        def run():
+            compress(content, level)
+        run.extra = {
+            'bytes_in': len(content),
+            'bytes_out': len(compressed),
+            'ratio': round(len(compressed) / len(content), 3),
+        }
+        return run
+    return setup
+
+
+COMPRESSION_LEVELS = [('gzip', gzip_compress, level) for level in (1, 5, 9)]
+if brotli is not None:
+    COMPRESSION_LEVELS += [
+        ('brotli', brotli_compress, quality) for quality in (4, 11)]
+for _name, _compress, _level in COMPRESSION_LEVELS:
+    benchmark(f'compress_{_name}{_level}_recipe_page_500')(
+        compression_benchmark(_compress, _level, recipe_page_payload))
+    benchmark(f'compress_{_name}{_level}_ingredients')(
+        compression_benchmark(_compress, _level, ingredients_payload))
@@ -0,0 +1,33 @@
+"""Стоимость подключения к БД."""
+from api.benchmarks.base import benchmark
+from django.db import close_old_connections, connection
+
+
+def select_one():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+@benchmark('db_connect_per_request', atomic=False)
+def db_connect_per_request(options):
+    """Запрос с новым подключением к БД, как при CONN_MAX_AGE=0."""
+    def run():
+        connection.close()
+        select_one()
+    return run
+
+
+@benchmark('db_persistent_connection', atomic=False)
+def db_persistent_connection(options):
+    """
+    Запрос с постоянным подключением: проверка возраста и
+    работоспособности соединения, как в начале каждого запроса Django.
+    Соединение не устаревает независимо от DB_CONN_MAX_AGE.
+    """
+    select_one()
+    connection.close_at = None
+
+    def run():
+        close_old_connections()
+        select_one()
+    return run
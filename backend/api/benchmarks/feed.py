@@ -0,0 +1,20 @@
+"""Лента подписок: материализованная и соединением."""
+from api.benchmarks.base import benchmark, busiest_user
+from api.feed import feed_recipe_ids
+from recipes.models import Recipe
+
+
+@benchmark('feed_timeline')
+def feed_timeline(options):
+    """Страница ленты пользователя с наибольшим числом подписок."""
+    user = busiest_user('follower')
+    return lambda: feed_recipe_ids(user, 6)
+
+
+@benchmark('feed_subscriptions_join')
+def feed_subscriptions_join(options):
+    """Та же страница соединением рецептов с подписками."""
+    user = busiest_user('follower')
+    return lambda: list(Recipe.objects.filter(
+        author__following__user=user
+    ).order_by('-id').values_list('id', flat=True)[:6])
@@ -0,0 +1,73 @@
+"""Поиск по продуктам: индекс в памяти и ORM."""
+import random
+from functools import lru_cache
+
+from api.benchmarks.base import benchmark
+from api.pantry import PantryIndex, pantry_index
+from django.db.models import Count, F, Q
+from recipes.management.commands.seed_bench_data import zipf_cum_weights
+from recipes.models import Ingredient, Recipe
+
+
+def pantry_ingredients(size=15):
+    """Самые популярные ингредиенты - худший случай для поиска."""
+    return list(Ingredient.objects.annotate(
+        usage=Count('used_in_recipes')
+    ).order_by('-usage').values_list('id', flat=True)[:size])
+
+
+def pantry_page(index, ingredient_ids):
+    """Первая страница и общее число результатов, как в пагинаторе."""
+    results = index.search(ingredient_ids)
+    return len(results), results[0:6]
+
+
+@benchmark('pantry_index_search')
+def pantry_index_search(options):
+    ingredient_ids = pantry_ingredients()
+
+    def run():
+        pantry_index.refresh()
+        return pantry_page(pantry_index, ingredient_ids)
+    return run
+
+
+@benchmark('pantry_orm_search')
+def pantry_orm_search(options):
+    ingredient_ids = pantry_ingredients()
+
+    def run():
+        return list(Recipe.objects.annotate(
+            used=Count('ingredient_amounts', filter=Q(
+                ingredient_amounts__ingredient__in=ingredient_ids)),
+            total=Count('ingredient_amounts'),
+        ).filter(used__gt=0).annotate(
+            missing=F('total') - F('used')
+        ).order_by('missing', '-used', '-id').values_list(
+            'id', 'used', 'missing')[:6])
+    return run
+
+
+@lru_cache(maxsize=None)
+def synthetic_pantry_index(recipes=1000000, ingredients=2000, seed=42):
+    """Индекс на синтетических данных с распределением Ципфа."""
+    rng = random.Random(seed)
+    weights = zipf_cum_weights(ingredients)
+    population = range(1, ingredients + 1)
+
+    def rows():
+        for recipe_id in range(1, recipes + 1):
+            for ingredient_id in set(rng.choices(
+                    population, cum_weights=weights, k=rng.randint(3, 12))):
+                yield recipe_id, ingredient_id
+    index = PantryIndex()
+    index.build(rows())
+    return index
+
+
+@benchmark('pantry_index_search_1m', atomic=False)
+def pantry_index_search_1m(options):
+    """Поиск по 15 самым частым ингредиентам среди 1 млн рецептов."""
+    index = synthetic_pantry_index()
+    ingredient_ids = list(range(1, 16))
+    return lambda: pantry_page(index, ingredient_ids)
@@ -0,0 +1,19 @@
+"""Сортировка по популярности."""
+from api.benchmarks.base import benchmark
+from django.db.models import Count
+from recipes.models import Recipe
+
+
+@benchmark('recipes_popular_stored')
+def recipes_popular_stored(options):
+    """Первая страница ?ordering=popular по хранимой популярности."""
+    return lambda: list(Recipe.objects.order_by(
+        '-popularity', '-id').values_list('id', flat=True)[:6])
+
+
+@benchmark('recipes_popular_count')
+def recipes_popular_count(options):
+    """Та же страница с подсчетом избранного в каждом запросе."""
+    return lambda: list(Recipe.objects.annotate(
+        favorites=Count('users_recipes')
+    ).order_by('-favorites', '-id').values_list('id', flat=True)[:6])
@@ -0,0 +1,35 @@
+"""Сериализация ответов в JSON: stdlib и orjson."""
+from api.benchmarks.base import (annotated_recipes, benchmark, busiest_user,
+                                 make_request)
+from api.fast_recipes import RECIPE_FIELDS, render_recipes
+from api.renderers import ORJSONRenderer
+from api.serializers import IngredientSerializer
+from recipes.models import Ingredient
+from rest_framework.renderers import JSONRenderer
+
+
+def json_render_benchmark(renderer_class, payload):
+    def setup(options):
+        data = payload()
+        renderer = renderer_class()
+        return lambda: renderer.render(data)
+    return setup
+
+
+def recipe_page_payload():
+    user = busiest_user('favorite_recipes')
+    return render_recipes(
+        annotated_recipes(user).values(*RECIPE_FIELDS)[:500],
+        make_request(user))
+
+
+def ingredients_payload():
+    return IngredientSerializer(Ingredient.objects.all(), many=True).data
+
+
+for _name, _renderer_class in (('stdlib', JSONRenderer),
+                               ('orjson', ORJSONRenderer)):
+    benchmark(f'json_{_name}_recipe_page_500')(
+        json_render_benchmark(_renderer_class, recipe_page_payload))
+    benchmark(f'json_{_name}_ingredients')(
+        json_render_benchmark(_renderer_class, ingredients_payload))
@@ -0,0 +1,79 @@
+"""Сериализаторы DRF и быстрый рендеринг рецептов."""
+from api.benchmarks.base import (annotated_recipes, benchmark, busiest_user,
+                                 make_request)
+from api.fast_recipes import RECIPE_FIELDS, render_recipes
+from api.serializers import (RecipeCreateSerializer, RecipeGetSerializer,
+                             SubscriptionSerializer)
+from django.contrib.auth import get_user_model
+from recipes.models import Ingredient, Tag
+
+User = get_user_model()
+
+
+def recipe_page_benchmark(page_size):
+    def setup(options):
+        user = busiest_user('favorite_recipes')
+        request = make_request(user)
+        queryset = annotated_recipes(user)
+
+        def run():
+            page = list(queryset[:page_size])
+            return RecipeGetSerializer(
+                page, many=True, context={'request': request}).data
+        return run
+    return setup
+
+
+def fast_recipe_page_benchmark(page_size):
+    def setup(options):
+        user = busiest_user('favorite_recipes')
+        request = make_request(user)
+        queryset = annotated_recipes(user).values(*RECIPE_FIELDS)
+
+        def run():
+            return render_recipes(queryset[:page_size], request)
+        return run
+    return setup
+
+
+for _page_size in (6, 50, 500):
+    benchmark(f'recipe_get_serializer_{_page_size}')(
+        recipe_page_benchmark(_page_size))
+    benchmark(f'recipe_fast_renderer_{_page_size}')(
+        fast_recipe_page_benchmark(_page_size))
+
+
+@benchmark('subscription_serializer')
+def subscription_serializer(options):
+    user = busiest_user('follower')
+    request = make_request(user, '/api/users/subscriptions/',
+                           recipes_limit=3)
+
+    def run():
+        authors = list(User.objects.filter(following__user=user)[:6])
+        return SubscriptionSerializer(
+            authors, many=True, context={'request': request}).data
+    return run
+
+
+@benchmark('recipe_create')
+def recipe_create(options):
+    author = User.objects.order_by('id').first()
+    tags = list(Tag.objects.all()[:2])
+    ingredient_ids = list(
+        Ingredient.objects.values_list('id', flat=True)[:10])
+
+    def run():
+        serializer = RecipeCreateSerializer(
+            context={'request': make_request(author)})
+        return serializer.create({
+            'author': author,
+            'name': 'Бенчмарк',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': 'recipes/bench.png',
+            'tags': tags,
+            'ingredients': [{'id': ingredient_id, 'amount': 10}
+                            for ingredient_id in ingredient_ids],
+        })
+    return run
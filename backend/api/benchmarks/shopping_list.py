@@ -0,0 +1,24 @@
+"""Список покупок: агрегация и готовые файлы."""
+from api.benchmarks.base import benchmark, busiest_user
+from api.shopping_cart import get_shopping_list
+from api.shopping_list_files import render_pdf, shopping_list_file
+
+
+@benchmark('get_shopping_list')
+def shopping_list(options):
+    user = busiest_user('shopping_cart')
+    return lambda: get_shopping_list(user)
+
+
+@benchmark('shopping_list_pdf_render')
+def shopping_list_pdf_render(options):
+    user = busiest_user('shopping_cart')
+    return lambda: render_pdf(user.id)
+
+
+@benchmark('shopping_list_file_cached')
+def shopping_list_file_cached(options):
+    """Повторное скачивание: готовый файл текущей версии корзины."""
+    user = busiest_user('shopping_cart')
+    shopping_list_file(user.id, 'pdf')
+    return lambda: shopping_list_file(user.id, 'pdf')
@@ -0,0 +1,30 @@
+"""Генерация коротких ссылок."""
+import string
+from itertools import islice, product
+
+from api.benchmarks.base import benchmark
+from recipes.models import Recipe, ShortLink
+
+
+@benchmark('short_link_generate')
+def short_link_generate(options):
+    """
+    Генерация ссылки при заполнении пространства ключей
+    на долю options['short_link_fill'].
+    """
+    characters = string.ascii_letters + string.digits
+    keyspace = len(characters) ** 3
+    target = int(keyspace * options['short_link_fill'])
+    missing = target - ShortLink.objects.count()
+    if missing > 0:
+        used = set(ShortLink.objects.values_list('short_link', flat=True))
+        codes = (''.join(code) for code in product(characters, repeat=3))
+        codes = (code for code in codes if code not in used)
+        recipe_ids = Recipe.objects.filter(
+            short_link__isnull=True).values_list('id', flat=True)[:missing]
+        ShortLink.objects.bulk_create(
+            (ShortLink(recipe_id=recipe_id, short_link=code)
+             for recipe_id, code in zip(recipe_ids, islice(codes, missing))),
+            batch_size=5000
+        )
+    return ShortLink().generate_short_link
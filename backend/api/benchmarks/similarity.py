@@ -0,0 +1,33 @@
+"""Похожие рецепты: индекс LSH и SQL."""
+from api.benchmarks.base import benchmark
+from api.similarity import similar_recipe_ids
+from django.db.models import Count
+from recipes.models import Recipe, RecipeIngredient
+
+
+def similar_recipe():
+    """Рецепт с наибольшим числом ингредиентов."""
+    return Recipe.objects.annotate(
+        ingredient_count=Count('ingredient_amounts')
+    ).order_by('-ingredient_count').first()
+
+
+@benchmark('similar_recipes_index')
+def similar_recipes_index(options):
+    recipe = similar_recipe()
+    return lambda: similar_recipe_ids(recipe.id, 6)
+
+
+@benchmark('similar_recipes_jaccard_sql')
+def similar_recipes_jaccard_sql(options):
+    """Общие ингредиенты со всеми рецептами в момент запроса."""
+    recipe = similar_recipe()
+
+    def run():
+        return list(RecipeIngredient.objects.filter(
+            ingredient__in=RecipeIngredient.objects.filter(
+                recipe=recipe).values('ingredient')
+        ).exclude(recipe=recipe).values('recipe').annotate(
+            shared=Count('id')
+        ).order_by('-shared').values_list('recipe', flat=True)[:6])
+    return run
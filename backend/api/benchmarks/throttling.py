@@ -0,0 +1,49 @@
+"""Проверка ограничения частоты запросов."""
+from api.benchmarks.base import benchmark, busiest_user, make_request
+from api.throttling import TokenBucketThrottle
+from rest_framework.throttling import UserRateThrottle
+
+
+class ThrottledView:
+    """Представление-заглушка с областью ограничения search."""
+
+    action = 'list'
+    throttle_scopes = {'list': 'search'}
+
+
+def throttle_benchmark(make_throttle, checks=1000):
+    """
+    checks проверок ограничения одного пользователя; ставка выше числа
+    проверок, запросы не отклоняются.
+    """
+    def setup(options):
+        request = make_request(busiest_user('favorite_recipes'))
+        view = ThrottledView()
+        throttle = make_throttle(checks * 10)
+        throttle.cache.clear()
+
+        def run():
+            for _ in range(checks):
+                if not throttle.allow_request(request, view):
+                    raise AssertionError('Запрос отклонен ограничением.')
+        return run
+    return setup
+
+
+def token_bucket_throttle(capacity):
+    throttle = TokenBucketThrottle()
+    throttle.rates = {'search': f'{capacity}/min'}
+    return throttle
+
+
+def simple_rate_throttle(capacity):
+    """Стандартное ограничение DRF: хранит время каждого запроса."""
+    throttle_class = type('BenchmarkRateThrottle', (UserRateThrottle,),
+                          {'rate': f'{capacity}/min'})
+    return throttle_class()
+
+
+benchmark('throttle_token_bucket_x1000')(
+    throttle_benchmark(token_bucket_throttle))
+benchmark('throttle_drf_simple_rate_x1000')(
+    throttle_benchmark(simple_rate_throttle))
@@ -0,0 +1,144 @@
+"""
+Сжатие ответов API с выбором кодировки по Accept-Encoding.
+
+Brotli используется, если установлен пакет brotli, иначе gzip.
+Потоковые ответы (файлы, выгрузки) и ответы меньше
+COMPRESSION_MIN_SIZE не сжимаются. Справочники из
+COMPRESSION_PRECOMPRESS_PATHS сжимаются один раз с максимальной
+степенью и отдаются из памяти процесса, пока не изменится тело ответа.
+"""
+import gzip
+import hashlib
+import re
+import threading
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+ACCEPT_ENCODING_RE = re.compile(
+    r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*(?:,|$)')
+
+
+def gzip_compress(content, level):
+    # mtime=0: одинаковое тело дает одинаковый результат.
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def brotli_compress(content, quality):
+    return brotli.compress(content, mode=brotli.MODE_TEXT, quality=quality)
+
+
+def compressors():
+    """Кодировки в порядке предпочтения: (имя, функция, уровень, макс.)."""
+    available = []
+    if brotli is not None:
+        available.append(('br', brotli_compress,
+                          settings.COMPRESSION_BROTLI_QUALITY, 11))
+    available.append(('gzip', gzip_compress,
+                      settings.COMPRESSION_GZIP_LEVEL, 9))
+    return available
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q."""
+    accepted = set()
+    for name, quality in ACCEPT_ENCODING_RE.findall(header.lower()):
+        try:
+            if quality and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name)
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    for encoding in compressors():
+        if encoding[0] in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+class PrecompressedStore:
+    """Сжатые с максимальной степенью тела справочников."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bodies = {}
+
+    def get(self, path, encoding, content):
+        name, compress, _, max_level = encoding
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        key = (path, name)
+        cached = self._bodies.get(key)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        body = compress(content, max_level)
+        with self._lock:
+            self._bodies[key] = (digest, body)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+
+
+precompressed = PrecompressedStore()
+
+
+def is_compressible(response):
+    if response.streaming or response.status_code != 200:
+        return False
+    if response.has_header('Content-Encoding'):
+        return False
+    content_type = response.get('Content-Type', '')
+    return (content_type.startswith(COMPRESSIBLE_TYPES)
+            and len(response.content) >= settings.COMPRESSION_MIN_SIZE)
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы gzip или brotli.
+    В отличие от django.middleware.gzip, сжимает только ответы
+    не меньше порога и не трогает потоковые ответы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not settings.COMPRESSION_ENABLED or not is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        name, compress, level, _ = encoding
+        content = response.content
+        if (request.path in settings.COMPRESSION_PRECOMPRESS_PATHS
+                and not request.META.get('QUERY_STRING')):
+            body = precompressed.get(request.path, encoding, content)
+        else:
+            body = compress(content, level)
+        if len(body) >= len(content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = name
+        # Сжатое представление отличается побайтно, сильный ETag
+        # становится слабым (как в django.middleware.gzip).
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,107 @@
+"""
+Валидаторы условных GET-запросов (ETag, Last-Modified) для рецептов.
+
+Ответ зависит от рецептов и от состояния текущего пользователя
+(избранное, корзина, подписки), поэтому ETag учитывает и то и другое.
+Last-Modified отдается только анонимным пользователям.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
+from recipes.models import FavoriteRecipe, Recipe, RecipeChange, ShoppingCart
+from users.models import Follower
+
+
+def touch_recipes(queryset):
+    """Обновляет updated_at рецептов без сохранения моделей."""
+    queryset.update(updated_at=timezone.now())
+
+
+def relation_state(model, user_field='user'):
+    """Подзапрос 'максимальный id:количество' связей пользователя."""
+    relations = model.objects.filter(
+        **{user_field: OuterRef('pk')}).order_by().values(user_field)
+    return (
+        Coalesce(Subquery(relations.annotate(
+            value=Max('id')).values('value')), 0),
+        Coalesce(Subquery(relations.annotate(
+            value=Count('id')).values('value')), 0),
+    )
+
+
+def user_state(user):
+    """Версия избранного, корзины и подписок пользователя."""
+    if not user.is_authenticated:
+        return ()
+    expressions = {}
+    for name, model in (('favorites', FavoriteRecipe),
+                        ('cart', ShoppingCart),
+                        ('follows', Follower)):
+        expressions[f'{name}_max'], expressions[f'{name}_count'] = (
+            relation_state(model))
+    return type(user).objects.filter(pk=user.pk).annotate(
+        **expressions).values_list(*expressions).get()
+
+
+def last_deletion():
+    return RecipeChange.objects.filter(deleted=True).aggregate(
+        last=Max('id'))['last']
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(
+        ':'.join(map(str, parts)).encode()).hexdigest())
+
+
+def list_validators(user):
+    """
+    Валидаторы списков: время последнего изменения любого рецепта
+    и последнего удаления рецепта (удаление не меняет max(updated_at)).
+    Берутся по всей таблице, а не по выборке: рецепт, выпавший из
+    фильтра, не меняет max(updated_at) выборки.
+    """
+    last_modified = Recipe.objects.order_by().aggregate(
+        last=Max('updated_at'))['last']
+    etag = make_etag(last_modified, last_deletion(), *user_state(user))
+    return etag, last_modified
+
+
+def detail_validators(pk, user):
+    """Для некорректного pk - (None, None), ответ 404 дает представление."""
+    try:
+        pk = Recipe._meta.pk.to_python(pk)
+    except ValidationError:
+        return None, None
+    last_modified = Recipe.objects.filter(pk=pk).values_list(
+        'updated_at', flat=True).first()
+    if last_modified is None:
+        return None, None
+    return make_etag(pk, last_modified, *user_state(user)), last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304, если данные клиента актуальны, иначе None."""
+    if etag is None:
+        return None
+    return get_conditional_response(
+        request, etag=etag,
+        last_modified=(int(last_modified.timestamp())
+                       if last_modified and not request.user.is_authenticated
+                       else None)
+    )
+
+
+def set_validators(request, response, etag, last_modified):
+    if etag is None or response.status_code != 200:
+        return response
+    response['ETag'] = etag
+    if last_modified and not request.user.is_authenticated:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,104 @@
+"""
+Общие функции команд export_foodgram и import_foodgram.
+
+Выгрузка - каталог с файлом <app>.<model>.ndjson[.gz|.bz2|.xz] на каждую
+модель, манифестом manifest.json и списком медиафайлов media.ndjson.
+"""
+import bz2
+import gzip
+import lzma
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.contrib.auth.models import Permission
+from django.db import models
+
+# Версия 2: группы и права пользователей, права - по естественному ключу.
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+MANIFEST_NAME = 'manifest.json'
+MEDIA_MANIFEST_NAME = 'media.ndjson'
+
+COMPRESSIONS = {
+    'none': ('', open),
+    'gzip': ('.gz', gzip.open),
+    'bz2': ('.bz2', bz2.open),
+    'xz': ('.xz', lzma.open),
+}
+
+# Порядок важен: модель выгружается и загружается после моделей,
+# на которые ссылается. Производные таблицы (списки покупок, индекс
+# похожих рецептов, ленты) не выгружаются, а пересчитываются при загрузке.
+# Права (auth.Permission) создает migrate, id прав в разных БД могут
+# не совпадать, поэтому ссылки на них переводятся по манифесту.
+MODEL_LABELS = (
+    'users.User',
+    'authtoken.Token',
+    'auth.Group',
+    'auth.Group_permissions',
+    'users.User_groups',
+    'users.User_user_permissions',
+    'recipes.Tag',
+    'recipes.Ingredient',
+    'recipes.Recipe',
+    'recipes.Recipe_tags',
+    'recipes.RecipeIngredient',
+    'recipes.FavoriteRecipe',
+    'recipes.ShoppingCart',
+    'users.Follower',
+    'recipes.ShortLink',
+)
+
+
+def get_model(label):
+    return apps.get_model(label)
+
+
+def model_fields(model):
+    """Атрибуты хранимых полей модели (author_id, а не author)."""
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def file_fields(model):
+    return [field.attname for field in model._meta.concrete_fields
+            if isinstance(field, models.FileField)]
+
+
+def permission_fields(model):
+    return [field.attname for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model is Permission]
+
+
+def permission_keys(database):
+    """Права: (id, app_label, model, codename)."""
+    return list(Permission.objects.using(database).values_list(
+        'id', 'content_type__app_label', 'content_type__model', 'codename'))
+
+
+@contextmanager
+def keep_timestamps(models_list):
+    """
+    Отключает auto_now и auto_now_add полей моделей, чтобы bulk_create
+    сохранил выгруженные значения.
+    """
+    fields = [field for model in models_list
+              for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False)
+              or getattr(field, 'auto_now_add', False)]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield fields
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def data_file_name(label, compression):
+    return f'{label.lower()}.ndjson{COMPRESSIONS[compression][0]}'
+
+
+def open_data_file(path, mode, compression):
+    """Открывает файл выгрузки в двоичном режиме с нужным сжатием."""
+    return COMPRESSIONS[compression][1](path, mode)
@@ -0,0 +1,119 @@
+"""
+Лента рецептов авторов, на которых подписан пользователь.
+
+Рецепты обычных авторов при публикации записываются в ленты подписчиков
+(FeedEntry). Рецепты популярных авторов читаются при запросе ленты;
+когда автор перестает быть популярным, его рецепты записываются в ленты
+всех подписчиков (backfill_author).
+Обе части читаются по ключу id рецепта (keyset), без OFFSET.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from recipes.models import FeedEntry, Recipe
+from users.models import Follower
+
+POPULAR_AUTHORS_KEY = 'feed_popular_authors'
+
+
+def load_popular_authors(using='default'):
+    return frozenset(Follower.objects.using(using).values('author').annotate(
+        followers=Count('id')
+    ).filter(
+        followers__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('author', flat=True))
+
+
+def popular_authors():
+    """Авторы, рецепты которых не раскладываются по лентам."""
+    return cache.get_or_set(POPULAR_AUTHORS_KEY, load_popular_authors,
+                            settings.FEED_POPULAR_AUTHORS_TTL)
+
+
+def fan_out_recipe(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    if recipe.author_id in popular_authors():
+        return
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, author_id=recipe.author_id,
+                   recipe_id=recipe.id)
+         for user_id in Follower.objects.filter(
+             author_id=recipe.author_id).values_list('user_id', flat=True)),
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту рецепты автора при подписке."""
+    if author_id in popular_authors():
+        return
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, author_id=author_id, recipe_id=recipe_id)
+         for recipe_id in Recipe.objects.filter(
+             author_id=author_id).values_list('id', flat=True)),
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+def backfill_author(author_id, batch_size=5000):
+    """Добавляет все рецепты автора в ленты всех его подписчиков."""
+    rows = (
+        FeedEntry(user_id=user_id, author_id=author_id, recipe_id=recipe_id)
+        for user_id, recipe_id in Follower.objects.filter(
+            author_id=author_id, author__recipes__isnull=False
+        ).values_list('user_id', 'author__recipes__id').order_by().iterator()
+    )
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        FeedEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+
+
+def follower_count(author_id):
+    return Follower.objects.filter(author_id=author_id).count()
+
+
+def left_popular(before, after):
+    """
+    Автор перестал быть популярным: подписчиков было больше
+    FEED_FANOUT_MAX_FOLLOWERS, а стало не больше. Каскадное или массовое
+    удаление может перескочить порог сразу на несколько подписчиков.
+    """
+    return before > settings.FEED_FANOUT_MAX_FOLLOWERS >= after
+
+
+def remove_from_feed(user_id, author_id):
+    """Удаляет рецепты автора из ленты при отписке."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def feed_recipe_ids(user, limit, before=None):
+    """
+    Id рецептов ленты по убыванию, меньше before.
+    Записи ленты и рецепты популярных авторов читаются по limit штук
+    и сливаются; рецепт может оказаться в обеих частях, если автор стал
+    популярным после публикации.
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+    ids = set(entries.order_by('-recipe_id').values_list(
+        'recipe_id', flat=True)[:limit])
+
+    popular = popular_authors()
+    if popular:
+        authors = list(Follower.objects.filter(
+            user=user, author_id__in=popular
+        ).values_list('author_id', flat=True))
+        if authors:
+            recipes = Recipe.objects.filter(author_id__in=authors)
+            if before is not None:
+                recipes = recipes.filter(id__lt=before)
+            ids.update(recipes.order_by('-id').values_list(
+                'id', flat=True)[:limit])
+    return sorted(ids, reverse=True)[:limit]
@@ -1,6 +1,76 @@
+import time
+
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
+from django_filters.widgets import QueryArrayWidget
 from recipes.models import Ingredient, Recipe, Tag
 
+TAG_SLUGS_TTL = 60
+# Неизвестный slug перечитывает теги не чаще раза за этот интервал (сек.),
+# чтобы запросы с несуществующими slug не обращались к БД каждый раз.
+TAG_SLUGS_MISS_RELOAD = 5
+
+
+class TagSlugMap:
+    """
+    Кэш соответствия slug -> id тегов в памяти процесса.
+    Перечитывается по истечении TTL или при неизвестном slug,
+    но не чаще раза в miss_reload секунд.
+    """
+
+    def __init__(self, ttl=TAG_SLUGS_TTL, miss_reload=TAG_SLUGS_MISS_RELOAD):
+        self.ttl = ttl
+        self.miss_reload = miss_reload
+        self.ids = {}
+        self.loaded_at = None
+
+    def reload(self):
+        self.ids = dict(Tag.objects.values_list('slug', 'id'))
+        self.loaded_at = time.monotonic()
+
+    def get_ids(self, slugs):
+        """Возвращает id известных тегов и неизвестные slug."""
+        age = (None if self.loaded_at is None
+               else time.monotonic() - self.loaded_at)
+        if (age is None or age > self.ttl
+                or (age > self.miss_reload
+                    and not set(slugs) <= self.ids.keys())):
+            self.reload()
+        return ([self.ids[slug] for slug in slugs if slug in self.ids],
+                [slug for slug in slugs if slug not in self.ids])
+
+
+tag_slug_map = TagSlugMap()
+
+
+class SlugListField(forms.Field):
+    """
+    Список slug из ?tags=a&tags=b или ?tags=a,b.
+    Очищенное значение - список id тегов; неизвестный slug - ошибка 400.
+    """
+
+    widget = QueryArrayWidget
+    default_error_messages = {
+        'invalid_choice': forms.ModelMultipleChoiceField
+        .default_error_messages['invalid_choice'],
+    }
+
+    def clean(self, value):
+        slugs = list(dict.fromkeys(
+            slug.strip() for item in value or ()
+            for slug in item.split(',') if slug.strip()))
+        ids, unknown = tag_slug_map.get_ids(slugs)
+        if unknown:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice', params={'value': unknown[0]})
+        return ids
+
+
+class SlugListFilter(filters.Filter):
+    field_class = SlugListField
+
 
 class IngredientFilter(FilterSet):
     """Фильтрация ингредиентов."""
@@ -15,19 +85,28 @@ class IngredientFilter(FilterSet):
 class RecipeFilter(FilterSet):
     """Фильтр рецептов."""
 
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
-    )
+    tags = SlugListFilter(method='filter_tags')
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'Популярные'),), method='filter_ordering')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'ordering')
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Оставляет рецепты хотя бы с одним из тегов (value - id тегов).
+        Один подзапрос EXISTS без JOIN, поэтому рецепты не дублируются.
+        """
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=value)
+        ))
 
     def filter_is_favorited(self, queryset, name, value):
         """
@@ -52,3 +131,10 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(in_shopping_carts__user=request.user)
         return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        """
+        ?ordering=popular - по убыванию популярности.
+        Порядок совпадает с индексом recipe_popularity_idx.
+        """
+        return queryset.order_by('-popularity', '-id')
@@ -0,0 +1,142 @@
+"""
+Очередь фоновых задач в базе данных (модель Job), без внешнего брокера.
+
+Задача регистрируется декоратором task и ставится в очередь enqueue.
+Команда run_worker забирает задачи по приоритету и выполняет их в пуле
+потоков или процессов. Взятая задача невидима для других воркеров
+timeout секунд (visibility timeout); задача с ошибкой повторяется
+с экспоненциальной задержкой, пока не кончатся попытки.
+"""
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+from recipes.models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+PENDING = (Job.QUEUED, Job.RUNNING)
+
+
+def task(name, queue='default', priority=0, max_attempts=3, timeout=None):
+    """
+    Регистрирует функцию как фоновую задачу. Функция получает
+    параметры задачи именованными аргументами и возвращает
+    сериализуемый в JSON результат.
+    """
+    def decorator(func):
+        func.queue = queue
+        func.priority = priority
+        func.max_attempts = max_attempts
+        func.timeout = timeout or settings.JOBS_VISIBILITY_TIMEOUT
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def queues():
+    return sorted({func.queue for func in TASKS.values()})
+
+
+def enqueue(name, payload=None, user=None, priority=None, delay=0):
+    """
+    Ставит задачу в очередь. Внутри транзакции задача станет
+    видна воркерам только после фиксации. С JOBS_RUN_INLINE
+    задача выполняется сразу, в текущем процессе.
+    """
+    func = TASKS[name]
+    job = Job(
+        name=name,
+        queue=func.queue,
+        payload=payload or {},
+        priority=func.priority if priority is None else priority,
+        max_attempts=func.max_attempts,
+        available_at=timezone.now() + timedelta(seconds=delay),
+        user=user,
+    )
+    if settings.JOBS_RUN_INLINE:
+        job.result = func(**job.payload)
+        job.status = Job.DONE
+        job.attempts = 1
+        job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def claim(queue, worker_id, limit=1):
+    """
+    Забирает до limit доступных задач очереди. Занятые другой
+    транзакцией строки пропускаются (SKIP LOCKED), повторная проверка
+    условий в UPDATE не дает двум воркерам взять одну задачу.
+    """
+    now = timezone.now()
+    token = f'{worker_id}:{uuid.uuid4().hex[:8]}'
+    pending = Job.objects.filter(
+        queue=queue, status__in=PENDING, available_at__lte=now)
+    with transaction.atomic():
+        ids = list(pending.select_for_update(skip_locked=True).order_by(
+            '-priority', 'available_at', 'id'
+        ).values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        pending.filter(id__in=ids).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_by=token,
+            available_at=Case(
+                *(When(name=name, then=Value(
+                    now + timedelta(seconds=func.timeout)))
+                  for name, func in TASKS.items()),
+                default=Value(now + timedelta(
+                    seconds=settings.JOBS_VISIBILITY_TIMEOUT)),
+                output_field=DateTimeField()
+            ),
+        )
+    return list(Job.objects.filter(locked_by=token).order_by(
+        '-priority', 'id'))
+
+
+def run_job(job):
+    """
+    Выполняет взятую задачу и записывает результат. Если задачу
+    уже забрал другой воркер по истечении timeout, запись не меняется
+    и возвращается False.
+    """
+    func = TASKS.get(job.name)
+    owned = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {job.name}.')
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Попытки исчерпаны: воркер не завершил '
+                               'задачу за отведенное время.')
+        result = func(**job.payload)
+    except Exception:
+        logger.exception('Задача %s #%s завершилась ошибкой',
+                         job.name, job.pk)
+        now = timezone.now()
+        fields = {'last_error': traceback.format_exc(), 'locked_by': ''}
+        if func is not None and job.attempts < job.max_attempts:
+            fields.update(status=Job.QUEUED, available_at=now + timedelta(
+                seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)))
+        else:
+            fields.update(status=Job.FAILED, finished_at=now)
+        owned.update(**fields)
+        return False
+    return bool(owned.update(status=Job.DONE, result=result, locked_by='',
+                             finished_at=timezone.now()))
+
+
+def purge_finished():
+    """Удаляет завершенные задачи старше JOBS_KEEP_FINISHED секунд."""
+    return Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOBS_KEEP_FINISHED)
+    ).delete()[0]
@@ -0,0 +1,65 @@
+import os
+from itertools import islice
+from multiprocessing import Pool
+
+from api.similarity import compute_index, load_features, save_index
+from django.core.management import BaseCommand
+from django.db import transaction
+from recipes.models import Recipe, RecipeBucket, RecipeSignature
+
+
+class Command(BaseCommand):
+
+    help = ("Строит индекс похожих рецептов (MinHash/LSH). По умолчанию "
+            "индексирует только рецепты без сигнатуры.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать индекс для всех рецептов '
+                                 'в одной транзакции.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Число процессов для расчета сигнатур.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--database', default='default')
+
+    def chunks(self, recipe_ids, size, database):
+        """Порции (recipe_id, features)."""
+        recipe_ids = iter(recipe_ids)
+        while True:
+            chunk = list(islice(recipe_ids, size))
+            if not chunk:
+                return
+            yield list(load_features(chunk, database).items())
+
+    def build(self, recipe_ids, options):
+        total = 0
+        chunks = self.chunks(recipe_ids, options['chunk_size'],
+                             options['database'])
+        with Pool(options['workers']) as pool:
+            while True:
+                # Порции читаются из БД в основном потоке: генератор,
+                # переданный в imap, выполнялся бы в служебном потоке
+                # пула с собственным соединением.
+                batch = list(islice(chunks, options['workers']))
+                if not batch:
+                    return total
+                for rows in pool.imap_unordered(compute_index, batch):
+                    save_index(rows, recipe_ids=(),
+                               using=options['database'])
+                    total += len(rows)
+
+    def handle(self, *args, **options):
+        database = options['database']
+        recipes = Recipe.objects.using(database).order_by('id')
+        if options['full']:
+            # До фиксации /similar/ читает прежний индекс.
+            with transaction.atomic(using=database):
+                RecipeSignature.objects.using(database).all().delete()
+                RecipeBucket.objects.using(database).all().delete()
+                total = self.build(
+                    list(recipes.values_list('id', flat=True)), options)
+        else:
+            total = self.build(list(recipes.filter(
+                signature__isnull=True).values_list('id', flat=True)), options)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {total}'))
@@ -0,0 +1,74 @@
+import datetime
+from decimal import Decimal
+
+from api.benchmarks.base import annotated_recipes, busiest_user, make_request
+from api.fast_recipes import RECIPE_FIELDS, render_recipes
+from api.renderers import ORJSONRenderer
+from api.serializers import RecipeGetSerializer
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+# Значения, для которых ORJSONRenderer должен совпадать с JSONRenderer.
+EDGE_CASES = {
+    'int64': [2 ** 63 - 1, -2 ** 63],
+    'bigint': [2 ** 64, -2 ** 70],
+    'decimal': Decimal('12.50'),
+    'datetime': datetime.datetime(2024, 1, 2, 3, 4, 5, 678901,
+                                  tzinfo=datetime.timezone.utc),
+    'date': datetime.date(2024, 1, 2),
+    'lazy': gettext_lazy('Рецепт'),
+    'separators': 'a\u2028b\u2029c',
+    'keys': {1: 'int', None: 'none'},
+}
+
+
+class Command(BaseCommand):
+
+    help = ("Проверяет, что api.fast_recipes формирует побайтно тот же "
+            "JSON, что и RecipeGetSerializer, а ORJSONRenderer - тот же "
+            "JSON, что и JSONRenderer.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def check_orjson(self, data, expected, name):
+        actual = ORJSONRenderer().render(data)
+        if actual != expected:
+            raise CommandError(
+                f'ORJSONRenderer отличается ({name}):\n'
+                f'{expected[:500]}\n{actual[:500]}')
+
+    def handle(self, *args, **options):
+        for name, value in EDGE_CASES.items():
+            self.check_orjson(
+                {name: value}, JSONRenderer().render({name: value}), name)
+        renderer = JSONRenderer()
+        size = options['page_size']
+        checked = 0
+        for user in (AnonymousUser(), busiest_user('favorite_recipes'),
+                     busiest_user('follower')):
+            request = make_request(user)
+            queryset = annotated_recipes(user).order_by('-id')
+            for page in range(options['pages']):
+                offset = page * size
+                instances = list(queryset[offset:offset + size])
+                if not instances:
+                    break
+                data = RecipeGetSerializer(
+                    instances, many=True, context={'request': request}
+                ).data
+                expected = renderer.render(data)
+                self.check_orjson(data, expected, f'страница {page}')
+                actual = renderer.render(render_recipes(
+                    queryset.values(*RECIPE_FIELDS)[offset:offset + size],
+                    request))
+                if expected != actual:
+                    raise CommandError(
+                        f'Расхождение на странице {page} для {user}:\n'
+                        f'{expected[:500]}\n{actual[:500]}')
+                checked += len(instances)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено рецептов: {checked}, расхождений нет.'))
@@ -0,0 +1,67 @@
+from api.popularity import FAVORITE_WEIGHT, SHOPPING_CART_WEIGHT, decay_factor
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+
+# Меньшие значения обнуляются, чтобы не переписывать их при каждом запуске.
+MIN_POPULARITY = 0.001
+
+
+def count_subquery(model):
+    return Coalesce(Subquery(
+        model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+            'recipe').annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+
+    help = ("Уменьшает популярность рецептов с периодом полураспада "
+            "POPULARITY_HALF_LIFE_HOURS. Запускается по расписанию "
+            "с интервалом --hours.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=1,
+                            help='Часов с предыдущего запуска.')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Пересчитать по текущему избранному и '
+                                 'корзинам без учета времени.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            updated = Recipe.objects.update(popularity=(
+                count_subquery(FavoriteRecipe) * FAVORITE_WEIGHT
+                + count_subquery(ShoppingCart) * SHOPPING_CART_WEIGHT
+            ))
+            self.stdout.write(self.style.SUCCESS(
+                f'Популярность пересчитана для {updated} рецептов.'))
+            return
+
+        factor = decay_factor(options['hours'],
+                              settings.POPULARITY_HALF_LIFE_HOURS)
+        updated = 0
+        # Порции по диапазонам id: короткие транзакции и блокировки.
+        last_id = 0
+        while True:
+            ids = list(Recipe.objects.filter(
+                id__gt=last_id, popularity__gt=0
+            ).order_by('id').values_list('id', flat=True)[
+                :options['batch_size']])
+            if not ids:
+                break
+            batch = Recipe.objects.filter(id__gte=ids[0], id__lte=ids[-1])
+            with transaction.atomic():
+                batch.filter(popularity__gte=MIN_POPULARITY / factor).update(
+                    popularity=F('popularity') * Value(factor,
+                                                       FloatField()))
+                batch.filter(popularity__gt=0,
+                             popularity__lt=MIN_POPULARITY / factor).update(
+                    popularity=0)
+            updated += len(ids)
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Популярность {updated} рецептов умножена на {factor:.4f}.'))
@@ -0,0 +1,59 @@
+from api.benchmarks.base import annotated_recipes, busiest_user
+from api.shopping_cart import shopping_list_ingredients
+from django.core.management import BaseCommand
+from django.db.models import Count
+from recipes.models import Recipe, ShoppingListIngredient
+from users.models import Follower
+
+
+class Command(BaseCommand):
+
+    help = ("Выводит планы выполнения (EXPLAIN) основных запросов "
+            "для проверки индексов на заполненной БД.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help='EXPLAIN ANALYZE (только PostgreSQL).')
+        parser.add_argument('--output', help='Файл для сохранения планов.')
+
+    @staticmethod
+    def typical_author():
+        """
+        Автор с медианным числом рецептов.
+        У самого активного автора рецепты занимают заметную долю таблицы,
+        и планировщик предпочитает обход первичного ключа с фильтром.
+        """
+        authors = Recipe.objects.values('author').annotate(
+            total=Count('id')).order_by('total', 'author')
+        return authors[authors.count() // 2]['author']
+
+    def queries(self):
+        user = busiest_user('favorite_recipes')
+        author = busiest_user('recipes')
+        cart_user = busiest_user('shopping_cart')
+        recipes = annotated_recipes(user)
+        return {
+            'recipe_list': recipes[:6],
+            'recipe_author_page': recipes.filter(
+                author=self.typical_author())[:6],
+            'recipe_is_favorited_filter': recipes.filter(
+                users_recipes__user=user)[:6],
+            'shopping_list': shopping_list_ingredients(cart_user),
+            'shopping_list_materialized':
+                ShoppingListIngredient.objects.filter(user=cart_user),
+            'author_followers': Follower.objects.filter(
+                author=author).values('user_id'),
+            'is_subscribed': Follower.objects.filter(
+                user=user, author=author),
+        }
+
+    def handle(self, *args, **options):
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        report = []
+        for name, queryset in self.queries().items():
+            report.append(f'== {name}\n{queryset.explain(**explain_options)}\n')
+        text = '\n'.join(report)
+        self.stdout.write(text)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(text)
@@ -0,0 +1,106 @@
+import json
+import os
+from pathlib import Path
+
+import orjson
+from api.dataset import (COMPRESSIONS, FORMAT_VERSION, MANIFEST_NAME,
+                         MEDIA_MANIFEST_NAME, MODEL_LABELS, data_file_name,
+                         file_fields, get_model, model_fields, open_data_file,
+                         permission_keys)
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+
+    help = ("Выгружает данные Foodgram в каталог NDJSON-файлов по моделям. "
+            "Строки читаются порциями, память не зависит от объема БД.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Каталог для выгрузки.')
+        parser.add_argument('--compression', choices=COMPRESSIONS,
+                            default='gzip')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--database', default='default')
+
+    def rows(self, model, fields, database, chunk_size):
+        """
+        Строки модели по возрастанию pk. Через серверный курсор, если
+        он доступен; за pgbouncer - порциями по ключу pk.
+        """
+        queryset = model._default_manager.using(database).order_by('pk')
+        connection = connections[database]
+        if not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+            yield from queryset.values_list(*fields).iterator(
+                chunk_size=chunk_size)
+            return
+        pk_index = fields.index(model._meta.pk.attname)
+        last_pk = None
+        while True:
+            chunk = queryset
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            chunk = list(chunk.values_list(*fields)[:chunk_size])
+            if not chunk:
+                return
+            yield from chunk
+            last_pk = chunk[-1][pk_index]
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        if (output / MANIFEST_NAME).exists():
+            raise CommandError(f'Каталог {output} уже содержит выгрузку.')
+        compression = options['compression']
+        manifest = {
+            'version': FORMAT_VERSION,
+            'created_at': timezone.now().isoformat(),
+            'compression': compression,
+            'models': [],
+            'media': MEDIA_MANIFEST_NAME,
+        }
+        media_root = Path(settings.MEDIA_ROOT)
+
+        # Одна транзакция REPEATABLE READ в PostgreSQL дает согласованный
+        # снимок всех таблиц.
+        with transaction.atomic(using=options['database']), \
+                open(output / MEDIA_MANIFEST_NAME, 'wb') as media:
+            connection = connections[options['database']]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL '
+                                   'REPEATABLE READ READ ONLY')
+            manifest['permissions'] = permission_keys(options['database'])
+            for label in MODEL_LABELS:
+                model = get_model(label)
+                fields = model_fields(model)
+                files = [fields.index(name) for name in file_fields(model)]
+                name = data_file_name(label, compression)
+                count = 0
+                with open_data_file(output / name, 'wb', compression) as file:
+                    for row in self.rows(model, fields, options['database'],
+                                         options['chunk_size']):
+                        file.write(orjson.dumps(dict(zip(fields, row))))
+                        file.write(b'\n')
+                        count += 1
+                        for index in files:
+                            if row[index]:
+                                media.write(self.media_line(
+                                    media_root, row[index]))
+                manifest['models'].append(
+                    {'model': label, 'file': name, 'count': count})
+                self.stdout.write(f'{label}: {count}')
+
+        with open(output / MANIFEST_NAME, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Выгрузка сохранена в {output}'))
+
+    def media_line(self, media_root, name):
+        """Строка списка медиафайлов: путь и размер (None - файла нет)."""
+        try:
+            size = os.path.getsize(media_root / name)
+        except OSError:
+            size = None
+        return orjson.dumps({'path': name, 'size': size}) + b'\n'
@@ -0,0 +1,127 @@
+import json
+from itertools import islice
+from pathlib import Path
+
+import orjson
+from api.dataset import (MANIFEST_NAME, SUPPORTED_VERSIONS, get_model,
+                         keep_timestamps, open_data_file, permission_fields,
+                         permission_keys)
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError, call_command
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+
+    help = ("Загружает выгрузку export_foodgram в пустую БД порциями "
+            "через bulk_create и пересчитывает производные таблицы.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Каталог с выгрузкой.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Не пересчитывать списки покупок, '
+                                 'индекс похожих рецептов и ленты.')
+
+    def read_rows(self, path, compression, model, permissions, timestamps):
+        """
+        Объекты модели из файла выгрузки. Ссылки на права переводятся
+        в id этой БД; время, которого нет в старых выгрузках, - текущее.
+        """
+        remap = permission_fields(model)
+        timestamps = [field.attname for field in timestamps
+                      if field.model is model]
+        now = timezone.now()
+        with open_data_file(path, 'rb', compression) as file:
+            for line in file:
+                row = orjson.loads(line)
+                for name in remap:
+                    row[name] = permissions[row[name]]
+                for name in timestamps:
+                    row.setdefault(name, now)
+                yield model(**row)
+
+    def permission_map(self, source, database):
+        """Id прав выгрузки -> id прав этой БД по естественному ключу."""
+        target = {tuple(key): pk for pk, *key in permission_keys(database)}
+        missing = [key for _, *key in source if tuple(key) not in target]
+        if missing:
+            raise CommandError('В БД нет прав: ' + ', '.join(
+                f'{app_label}.{codename}'
+                for app_label, _, codename in missing))
+        return {pk: target[tuple(key)] for pk, *key in source}
+
+    def handle(self, *args, **options):
+        source = Path(options['input'])
+        try:
+            with open(source / MANIFEST_NAME, encoding='utf-8') as file:
+                manifest = json.load(file)
+        except OSError as error:
+            raise CommandError(f'Не найден манифест выгрузки: {error}')
+        if manifest['version'] not in SUPPORTED_VERSIONS:
+            raise CommandError(
+                f'Неподдерживаемая версия выгрузки: {manifest["version"]}')
+
+        database = options['database']
+        models = [get_model(item['model']) for item in manifest['models']]
+        not_empty = [model._meta.label for model in models
+                     if model._default_manager.using(database).exists()]
+        if not_empty:
+            raise CommandError(
+                f'Таблицы не пусты: {", ".join(not_empty)}')
+
+        permissions = self.permission_map(
+            manifest.get('permissions', []), database)
+
+        with transaction.atomic(using=database), \
+                keep_timestamps(models) as timestamps:
+            for item, model in zip(manifest['models'], models):
+                rows = self.read_rows(source / item['file'],
+                                      manifest['compression'], model,
+                                      permissions, timestamps)
+                count = 0
+                while True:
+                    chunk = list(islice(rows, options['batch_size']))
+                    if not chunk:
+                        break
+                    model._default_manager.using(database).bulk_create(chunk)
+                    count += len(chunk)
+                if count != item['count']:
+                    raise CommandError(
+                        f'{item["model"]}: загружено {count} строк '
+                        f'из {item["count"]}.')
+                self.stdout.write(f'{item["model"]}: {count}')
+            self.reset_sequences(database, models)
+
+        self.check_media(source / manifest['media'])
+        if not options['skip_derived']:
+            call_command('rebuild_shopping_lists', database=database)
+            call_command('build_similarity_index', full=True,
+                         database=database)
+            call_command('rebuild_feeds', database=database)
+        self.stdout.write(self.style.SUCCESS('Выгрузка загружена.'))
+
+    def reset_sequences(self, database, models):
+        """Счетчики id продолжаются после загруженных значений."""
+        connection = connections[database]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def check_media(self, path):
+        """Сверяет список медиафайлов выгрузки с MEDIA_ROOT."""
+        media_root = Path(settings.MEDIA_ROOT)
+        total = missing = 0
+        with open(path, 'rb') as file:
+            for line in file:
+                item = orjson.loads(line)
+                total += 1
+                if not (media_root / item['path']).is_file():
+                    missing += 1
+        message = f'Медиафайлов в выгрузке: {total}, отсутствует: {missing}'
+        self.stdout.write(
+            self.style.WARNING(message) if missing else message)
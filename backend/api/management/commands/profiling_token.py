@@ -0,0 +1,15 @@
+from api.profiling import make_token
+from django.conf import settings
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+
+    help = ("Выводит подписанное значение заголовка X-Profile для "
+            "профилирования запроса (действует PROFILING_TOKEN_MAX_AGE сек.).")
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
+        self.stderr.write(
+            f'Действителен {settings.PROFILING_TOKEN_MAX_AGE} сек. Пример: '
+            f'curl -H "X-Profile: <токен>" -H "X-Profile-Mode: sample" ...')
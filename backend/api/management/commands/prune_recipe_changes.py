@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+from recipes.models import RecipeChange
+
+
+class Command(BaseCommand):
+
+    help = ("Удаляет записи журнала изменений рецептов старше "
+            "RECIPE_CHANGES_KEEP_HOURS. Запускается по расписанию.")
+
+    def handle(self, *args, **options):
+        # Последнее удаление рецепта входит в ETag списков рецептов.
+        last_deletion = RecipeChange.objects.filter(deleted=True).aggregate(
+            last=Max('id'))['last']
+        deleted, _ = RecipeChange.objects.filter(
+            created_at__lt=timezone.now() - timedelta(
+                hours=settings.RECIPE_CHANGES_KEEP_HOURS)
+        ).exclude(id=last_deletion).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей журнала изменений: {deleted}'))
@@ -0,0 +1,51 @@
+from itertools import islice
+
+from api.feed import POPULAR_AUTHORS_KEY, load_popular_authors
+from django.core.cache import cache
+from django.core.management import BaseCommand
+from django.db import transaction
+from recipes.models import FeedEntry, Recipe
+
+
+class Command(BaseCommand):
+
+    help = ("Пересоздает ленты подписок: записывает рецепты авторов "
+            "в ленты их подписчиков, кроме популярных авторов.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        database = options['database']
+        with transaction.atomic(using=database):
+            total, popular = self.rebuild(database, options['batch_size'])
+        cache.delete(POPULAR_AUTHORS_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {total}, популярных авторов: {len(popular)}'))
+
+    def rebuild(self, database, batch_size):
+        popular = load_popular_authors(database)
+        entries = FeedEntry.objects.using(database)
+        entries.all().delete()
+        rows = (
+            FeedEntry(user_id=user_id, author_id=author_id,
+                      recipe_id=recipe_id)
+            for user_id, author_id, recipe_id in Recipe.objects.using(
+                database
+            ).filter(
+                author__following__isnull=False
+            ).exclude(
+                author_id__in=popular
+            ).values_list(
+                'author__following__user_id', 'author_id', 'id'
+            ).order_by().iterator()
+        )
+        total = 0
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            entries.bulk_create(chunk)
+            total += len(chunk)
+        return total, popular
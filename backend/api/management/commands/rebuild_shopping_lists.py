@@ -0,0 +1,73 @@
+from itertools import islice
+
+from api.shopping_cart import expected_shopping_lists
+from api.shopping_list_files import invalidate_all
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import ShoppingListIngredient
+
+
+class Command(BaseCommand):
+
+    help = ("Сверяет таблицу списков покупок с корзинами пользователей "
+            "и пересоздает ее. С --check только проверяет.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только проверить, без изменений.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_lists(options['database'])
+        else:
+            self.rebuild(options['batch_size'], options['database'])
+
+    def check_lists(self, database):
+        expected = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in expected_shopping_lists(
+                database)
+        }
+        actual = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in (
+                ShoppingListIngredient.objects.using(database).values_list(
+                    'user_id', 'ingredient_id', 'total_amount').iterator())
+        }
+        mismatched = {
+            key for key in expected.keys() | actual.keys()
+            if expected.get(key) != actual.get(key)
+        }
+        if mismatched:
+            users = sorted({user_id for user_id, _ in mismatched})
+            raise CommandError(
+                f'Расхождений: {len(mismatched)}, пользователи: '
+                f'{", ".join(map(str, users[:20]))}'
+                f'{" ..." if len(users) > 20 else ""}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок согласованы ({len(actual)} строк).'))
+
+    def rebuild(self, batch_size, database):
+        lists = ShoppingListIngredient.objects.using(database)
+        with transaction.atomic(using=database):
+            lists.all().delete()
+            rows = (
+                ShoppingListIngredient(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    total_amount=total)
+                for user_id, ingredient_id, total in expected_shopping_lists(
+                    database)
+            )
+            total = 0
+            while True:
+                chunk = list(islice(rows, batch_size))
+                if not chunk:
+                    break
+                lists.bulk_create(chunk)
+                total += len(chunk)
+            transaction.on_commit(invalidate_all, using=database)
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересозданы ({total} строк).'))
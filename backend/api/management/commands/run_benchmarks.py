@@ -0,0 +1,76 @@
+import json
+import subprocess
+from datetime import datetime, timezone
+
+from api.benchmarks import load_benchmarks
+from api.benchmarks.base import compare_results, run_benchmark
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+BASE_FIELDS = ('min_ms', 'median_ms', 'queries', 'repeat')
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+
+    help = ("Запускает микробенчмарки сериализаторов и агрегаций, "
+            "сохраняет результат в JSON и сравнивает с прошлым запуском.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help='Имена бенчмарков (по умолчанию все).')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Файл для сохранения JSON.')
+        parser.add_argument('--compare',
+                            help='JSON предыдущего запуска для сравнения.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимое замедление медианы (доля).')
+        parser.add_argument('--short-link-fill', type=float, default=0.5,
+                            help='Доля занятых коротких ссылок.')
+
+    def handle(self, *args, **options):
+        benchmarks = load_benchmarks()
+        names = options['names'] or list(benchmarks)
+        unknown = set(names) - set(benchmarks)
+        if unknown:
+            raise CommandError(f'Неизвестные бенчмарки: {sorted(unknown)}')
+
+        results = {}
+        for name in names:
+            results[name] = run_benchmark(
+                benchmarks[name], options['repeat'], options)
+            self.stdout.write(
+                f'{name}: median {results[name]["median_ms"]} мс, '
+                f'min {results[name]["min_ms"]} мс, '
+                f'{results[name]["queries"]} SQL'
+                + ''.join(f', {key} {value}'
+                          for key, value in results[name].items()
+                          if key not in BASE_FIELDS))
+
+        report = {
+            'commit': current_commit(),
+            'database': connection.vendor,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+            regressions = compare_results(
+                results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError(
+                    'Обнаружены регрессии:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
@@ -0,0 +1,119 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from api.jobs import claim, purge_finished, queues, run_job
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+
+def work(queue_names, worker_id, stop, batch_size):
+    """
+    Цикл воркера: берет задачи из очередей в порядке их перечисления
+    и ждет JOBS_POLL_INTERVAL, если задач нет. Ошибка БД не
+    останавливает воркер: задачу повторно возьмут после timeout.
+    """
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            jobs = []
+            try:
+                for queue in queue_names:
+                    jobs = claim(queue, worker_id, batch_size)
+                    if jobs:
+                        break
+                for job in jobs:
+                    run_job(job)
+            except DatabaseError:
+                logger.exception('Воркер %s: ошибка базы данных', worker_id)
+                connections.close_all()
+                jobs = []
+            if not jobs:
+                stop.wait(settings.JOBS_POLL_INTERVAL)
+    finally:
+        connections.close_all()
+
+
+def work_in_process(queue_names, worker_id, stop, batch_size):
+    # Сигналы останавливают родителя, дочерние процессы он
+    # останавливает через stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    work(queue_names, worker_id, stop, batch_size)
+
+
+class Command(BaseCommand):
+
+    help = ("Выполняет фоновые задачи из очереди в базе данных "
+            "(api.jobs) в пуле потоков или процессов.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help='Очередь (можно несколько, порядок '
+                                 'задает приоритет). По умолчанию все.')
+        parser.add_argument('--pool', choices=('thread', 'process'),
+                            default='thread')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=1,
+                            help='Сколько задач воркер берет за раз.')
+
+    def handle(self, *args, **options):
+        queue_names = options['queues'] or queues()
+        unknown = set(queue_names) - set(queues())
+        if unknown:
+            raise CommandError(f'Неизвестные очереди: {sorted(unknown)}')
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        # Обработчик сигнала меняет только stopping: set() события
+        # multiprocessing из обработчика блокируется, если основной
+        # поток в это время ждет того же события.
+        stopping = threading.Event()
+
+        if options['pool'] == 'process':
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            # Соединения с БД не должны переходить в дочерние процессы.
+            connections.close_all()
+            workers = [
+                context.Process(
+                    target=work_in_process,
+                    args=(queue_names, f'{worker_id}:{number}', stop,
+                          options['batch_size']),
+                    daemon=True)
+                for number in range(options['concurrency'])
+            ]
+        else:
+            stop = stopping
+            workers = [
+                threading.Thread(
+                    target=work,
+                    args=(queue_names, f'{worker_id}:{number}', stop,
+                          options['batch_size']),
+                    daemon=True)
+                for number in range(options['concurrency'])
+            ]
+
+        def shutdown(signum, frame):
+            self.stdout.write('Остановка: дожидаемся текущих задач.')
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        for worker in workers:
+            worker.start()
+        self.stdout.write(
+            f'Очереди {", ".join(queue_names)}: '
+            f'{options["concurrency"]} ({options["pool"]}).')
+
+        while not stopping.is_set():
+            purge_finished()
+            close_old_connections()
+            stopping.wait(settings.JOBS_PURGE_INTERVAL)
+        stop.set()
+        for worker in workers:
+            worker.join()
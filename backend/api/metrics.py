@@ -0,0 +1,265 @@
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+HISTOGRAMS = {
+    'foodgram_http_request_duration_seconds': (
+        'Время обработки запроса.', LATENCY_BUCKETS),
+    'foodgram_db_queries_per_request': (
+        'Количество SQL-запросов на один HTTP-запрос.', QUERY_BUCKETS),
+    'foodgram_db_query_duration_seconds': (
+        'Суммарное время SQL-запросов на один HTTP-запрос.', LATENCY_BUCKETS),
+    'foodgram_http_response_size_bytes': (
+        'Размер тела ответа.', SIZE_BUCKETS),
+}
+LABEL_NAMES = ('view', 'action', 'method', 'status')
+
+
+class MetricsRegistry:
+    """
+    Хранилище метрик одного процесса.
+    Периодически сбрасывается в файл, чтобы /metrics
+    мог объединить данные всех воркеров gunicorn.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._last_flush = 0.0
+
+    def observe(self, labels, values):
+        """Добавляет наблюдения для набора меток."""
+        with self._lock:
+            series = self._series.setdefault(labels, {})
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][1]
+                histogram = series.setdefault(
+                    name, {'buckets': [0] * (len(buckets) + 1),
+                           'sum': 0.0, 'count': 0})
+                index = next(
+                    (i for i, bound in enumerate(buckets) if value <= bound),
+                    len(buckets))
+                histogram['buckets'][index] += 1
+                histogram['sum'] += value
+                histogram['count'] += 1
+
+    def snapshot(self):
+        """Возвращает копию метрик в сериализуемом виде."""
+        with self._lock:
+            return [
+                [list(labels), {name: {'buckets': list(data['buckets']),
+                                       'sum': data['sum'],
+                                       'count': data['count']}
+                                for name, data in series.items()}]
+                for labels, series in self._series.items()
+            ]
+
+    def maybe_flush(self):
+        """Сбрасывает метрики в файл не чаще METRICS_FLUSH_INTERVAL."""
+        now = time.monotonic()
+        if now - self._last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        self.flush()
+
+    def flush(self):
+        """Сбрасывает метрики процесса в файл METRICS_DIR."""
+        if settings.METRICS_DIR:
+            write_snapshot(
+                worker_metrics_path(os.getpid()), self.snapshot())
+
+
+registry = MetricsRegistry()
+
+
+def worker_metrics_path(pid):
+    return os.path.join(settings.METRICS_DIR, f'metrics_{pid}.json')
+
+
+def write_snapshot(path, snapshot):
+    """Атомарно записывает снимок метрик в файл."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(snapshot, file)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return []
+
+
+def archive_worker(pid):
+    """
+    Переносит метрики завершившегося воркера в общий архив,
+    чтобы счетчики не уменьшались после перезапуска воркеров.
+    """
+    path = worker_metrics_path(pid)
+    if not os.path.exists(path):
+        return
+    archive_path = os.path.join(settings.METRICS_DIR, 'metrics_archive.json')
+    merged = merge_snapshots(
+        [read_snapshot(archive_path), read_snapshot(path)])
+    write_snapshot(archive_path, [
+        [list(labels), series] for labels, series in merged.items()])
+    os.remove(path)
+
+
+def clear_metrics_dir():
+    """Удаляет файлы метрик предыдущего запуска."""
+    directory = settings.METRICS_DIR
+    if directory and os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            if filename.startswith('metrics_'):
+                os.remove(os.path.join(directory, filename))
+
+
+def collect():
+    """Объединяет метрики текущего процесса и остальных воркеров."""
+    snapshots = [registry.snapshot()]
+    directory = settings.METRICS_DIR
+    own_file = os.path.basename(worker_metrics_path(os.getpid()))
+    if directory and os.path.isdir(directory):
+        snapshots.extend(
+            read_snapshot(os.path.join(directory, filename))
+            for filename in os.listdir(directory)
+            if filename.endswith('.json') and filename != own_file
+        )
+    return merge_snapshots(snapshots)
+
+
+def merge_snapshots(snapshots):
+    """Суммирует гистограммы одинаковых наборов меток."""
+    merged = {}
+    for snapshot in snapshots:
+        for labels, series in snapshot:
+            target = merged.setdefault(tuple(labels), {})
+            for name, data in series.items():
+                if name not in target:
+                    target[name] = {'buckets': list(data['buckets']),
+                                    'sum': data['sum'],
+                                    'count': data['count']}
+                    continue
+                histogram = target[name]
+                histogram['buckets'] = [
+                    a + b for a, b in zip(histogram['buckets'],
+                                          data['buckets'])]
+                histogram['sum'] += data['sum']
+                histogram['count'] += data['count']
+    return merged
+
+
+def _format_labels(labels, extra=''):
+    pairs = [
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in zip(LABEL_NAMES, labels)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}'
+
+
+def render_metrics(merged):
+    """Формирует текст в формате Prometheus exposition 0.0.4."""
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, series in sorted(merged.items()):
+            data = series.get(name)
+            if data is None:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), data['buckets']):
+                cumulative += count
+                label_str = _format_labels(labels, f'le="{bound}"')
+                lines.append(f'{name}_bucket{label_str} {cumulative}')
+            label_str = _format_labels(labels)
+            lines.append(f'{name}_sum{label_str} {data["sum"]}')
+            lines.append(f'{name}_count{label_str} {data["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Отдает метрики всех воркеров в формате Prometheus."""
+    return HttpResponse(
+        render_metrics(collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class QueryCounter:
+    """Обертка выполнения SQL, считающая количество и время запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики по каждому представлению DRF и его action:
+    время ответа, количество и время SQL-запросов, размер ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        view, action = getattr(request, '_metrics_view', ('unresolved', ''))
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        registry.observe(
+            (view, action, request.method, str(response.status_code)),
+            {
+                'foodgram_http_request_duration_seconds': duration,
+                'foodgram_db_queries_per_request': counter.count,
+                'foodgram_db_query_duration_seconds': counter.duration,
+                'foodgram_http_response_size_bytes': size,
+            }
+        )
+        registry.maybe_flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Запоминает имя представления и action для меток."""
+        view_class = getattr(view_func, 'cls', view_func)
+        actions = getattr(view_func, 'actions', None) or {}
+        request._metrics_view = (
+            view_class.__name__, actions.get(request.method.lower(), ''))
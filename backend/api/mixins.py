@@ -1,4 +1,5 @@
 from api.serializers import RecipeResponseSerializer
+from django.db import IntegrityError, transaction
 from rest_framework import status
 from rest_framework.response import Response
 
@@ -11,12 +12,16 @@ class RecipeListMixin:
         """Добавить рецепт в список (корзина или избранное)."""
         recipe = self.get_object()
         user = request.user
-        if self.model_class.objects.filter(user=user, recipe=recipe).exists():
+        try:
+            # Повторное добавление, в том числе параллельное, отклоняет
+            # уникальное ограничение (user, recipe).
+            with transaction.atomic():
+                self.model_class.objects.create(user=user, recipe=recipe)
+        except IntegrityError:
             return Response(
                 {'errors': f'Рецепт уже добавлен в {self.action_name}.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        self.model_class.objects.create(user=user, recipe=recipe)
         serializer = RecipeResponseSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
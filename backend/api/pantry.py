@@ -0,0 +1,290 @@
+"""
+Поиск рецептов по имеющимся ингредиентам.
+
+Каждый воркер держит в памяти инвертированный индекс
+ингредиент -> множество id рецептов. Множество хранится отсортированным
+массивом id, пока он компактнее битовой карты, и битовой картой (int)
+для частых ингредиентов. Число совпавших ингредиентов для всех рецептов
+сразу считается побитовым сумматором над битовыми картами.
+"""
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Max
+from recipes.models import RecipeChange, RecipeIngredient
+
+# При большем числе измененных рецептов индекс перечитывается целиком.
+MAX_INCREMENTAL_CHANGES = 10000
+# Записи журнала фиксируются не в порядке id: транзакция с меньшим id
+# может завершиться позже. Поэтому при обновлении перечитывается
+# столько id до последнего примененного, уже примененные пропускаются.
+CHANGE_WINDOW = 1000
+
+
+def popcount(bitmap):
+    return bin(bitmap).count('1')
+
+
+def ids_to_bitmap(ids):
+    """Битовая карта из возрастающего массива id."""
+    if not ids:
+        return 0
+    data = bytearray(ids[-1] // 8 + 1)
+    for recipe_id in ids:
+        data[recipe_id >> 3] |= 1 << (recipe_id & 7)
+    return int.from_bytes(data, 'little')
+
+
+def bitmap_to_ids(bitmap):
+    """Возрастающий массив id из битовой карты."""
+    ids = array('I')
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        if byte:
+            base = index << 3
+            ids.extend(base + bit for bit in range(8) if byte >> bit & 1)
+    return ids
+
+
+def iter_desc(bitmap):
+    """Id из битовой карты в порядке убывания."""
+    while bitmap:
+        recipe_id = bitmap.bit_length() - 1
+        yield recipe_id
+        bitmap ^= 1 << recipe_id
+
+
+class PantryIndex:
+    """Инвертированный индекс ингредиентов рецептов в памяти процесса."""
+
+    def __init__(self):
+        # (postings, totals): {ingredient_id: контейнер id} и рецепты по
+        # числу ингредиентов {count: bitmap}. Новое состояние собирается
+        # отдельно и публикуется одним присваиванием, поэтому search()
+        # без блокировки не видит postings и totals разных версий.
+        self.state = ({}, {})
+        self.max_id = 0
+        self.last_change_id = None
+        # Id примененных записей журнала в окне CHANGE_WINDOW.
+        self.applied = set()
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    def compact(self, ids):
+        """Массив занимает 4 байта на id, битовая карта - max_id / 8."""
+        if len(ids) * 32 < self.max_id:
+            return ids
+        return ids_to_bitmap(ids)
+
+    @staticmethod
+    def as_bitmap(postings, ingredient_id):
+        container = postings.get(ingredient_id, 0)
+        if isinstance(container, int):
+            return container
+        return ids_to_bitmap(container)
+
+    def as_ids(self, container):
+        if isinstance(container, int):
+            return bitmap_to_ids(container)
+        return container
+
+    def build(self, rows):
+        """Строит индекс по парам (recipe_id, ingredient_id)."""
+        postings = defaultdict(lambda: array('I'))
+        counts = defaultdict(int)
+        for recipe_id, ingredient_id in rows:
+            postings[ingredient_id].append(recipe_id)
+            counts[recipe_id] += 1
+        self.max_id = max(counts, default=0)
+        postings = {
+            ingredient_id: self.compact(array('I', sorted(ids)))
+            for ingredient_id, ids in postings.items()
+        }
+        by_count = defaultdict(list)
+        for recipe_id, count in counts.items():
+            by_count[count].append(recipe_id)
+        self.state = (postings, {
+            count: ids_to_bitmap(sorted(ids))
+            for count, ids in by_count.items()
+        })
+
+    def recent_changes(self, last_change_id):
+        return RecipeChange.objects.filter(
+            id__gt=last_change_id - CHANGE_WINDOW).order_by('id')
+
+    def load(self):
+        last_change_id = RecipeChange.objects.aggregate(
+            last=Max('id'))['last'] or 0
+        # Записи, видимые до построения, уже учтены в индексе;
+        # остальные из окна будут применены при обновлении.
+        applied = set(self.recent_changes(last_change_id).filter(
+            id__lte=last_change_id).values_list('id', flat=True))
+        self.build(RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id').iterator(chunk_size=10000))
+        self.last_change_id = last_change_id
+        self.applied = applied
+
+    def apply(self, recipe_ids, rows):
+        """
+        Заменяет данные рецептов recipe_ids парами (recipe_id,
+        ingredient_id). Контейнеры заменяются, а не изменяются, чтобы
+        параллельные запросы видели согласованные данные.
+        """
+        mask = ids_to_bitmap(sorted(recipe_ids))
+        removed = set(recipe_ids)
+        added = defaultdict(list)
+        counts = defaultdict(int)
+        for recipe_id, ingredient_id in rows:
+            added[ingredient_id].append(recipe_id)
+            counts[recipe_id] += 1
+        self.max_id = max(self.max_id, max(counts, default=0))
+
+        old_postings, old_totals = self.state
+        postings = dict(old_postings)
+        for ingredient_id, container in old_postings.items():
+            if isinstance(container, int):
+                if container & mask:
+                    postings[ingredient_id] = container & ~mask
+            elif any(recipe_id in removed for recipe_id in container):
+                postings[ingredient_id] = array(
+                    'I', (item for item in container if item not in removed))
+        for ingredient_id, ids in added.items():
+            ids = sorted(set(self.as_ids(postings.get(ingredient_id, ())))
+                         | set(ids))
+            postings[ingredient_id] = self.compact(array('I', ids))
+
+        totals = {count: bitmap & ~mask
+                  for count, bitmap in old_totals.items()}
+        for recipe_id, count in counts.items():
+            totals[count] = totals.get(count, 0) | 1 << recipe_id
+        self.state = (postings, totals)
+
+    def refresh(self):
+        """
+        Загружает индекс при первом обращении и не чаще раза
+        в PANTRY_INDEX_REFRESH секунд применяет журнал изменений.
+        Если журнал мог быть очищен после прошлой проверки
+        (RECIPE_CHANGES_KEEP_HOURS), индекс перечитывается целиком.
+        """
+        now = time.monotonic()
+        if (self.checked_at is not None
+                and now - self.checked_at < settings.PANTRY_INDEX_REFRESH):
+            return
+        with self._lock:
+            if (self.last_change_id is None
+                    or now - self.checked_at
+                    >= settings.RECIPE_CHANGES_KEEP_HOURS * 3600):
+                self.load()
+                self.checked_at = time.monotonic()
+                return
+            if now - self.checked_at < settings.PANTRY_INDEX_REFRESH:
+                return
+            changes = [
+                change for change in self.recent_changes(
+                    self.last_change_id
+                ).values_list('id', 'recipe_id')[
+                    :CHANGE_WINDOW + MAX_INCREMENTAL_CHANGES + 1]
+                if change[0] not in self.applied
+            ]
+            if len(changes) > MAX_INCREMENTAL_CHANGES:
+                self.load()
+            elif changes:
+                recipe_ids = {recipe_id for _, recipe_id in changes}
+                self.apply(recipe_ids, RecipeIngredient.objects.filter(
+                    recipe_id__in=recipe_ids
+                ).values_list('recipe_id', 'ingredient_id'))
+                self.last_change_id = max(self.last_change_id,
+                                          changes[-1][0])
+                low = self.last_change_id - CHANGE_WINDOW
+                self.applied = {
+                    change_id for change_id in self.applied if change_id > low
+                } | {change_id for change_id, _ in changes}
+            self.checked_at = time.monotonic()
+
+    def search(self, ingredient_ids):
+        """
+        Результаты поиска по набору ингредиентов.
+        Перед поиском индекс обновляется через refresh().
+        """
+        postings, totals = self.state
+        return PantryResults(
+            [self.as_bitmap(postings, ingredient_id)
+             for ingredient_id in set(ingredient_ids)],
+            totals
+        )
+
+
+class PantryResults:
+    """
+    Рецепты, в которых есть хотя бы один из ингредиентов, в порядке:
+    меньше недостающих ингредиентов, больше использованных, новее.
+    Поддерживает len() и срезы, поэтому подходит для пагинатора.
+    Элементы - кортежи (recipe_id, used, missing).
+    """
+
+    def __init__(self, bitmaps, totals):
+        self.totals = totals
+        self.any = 0
+        # Побитовый счетчик: planes[k] - k-й бит числа совпадений.
+        planes = []
+        for bitmap in bitmaps:
+            self.any |= bitmap
+            carry = bitmap
+            for index, plane in enumerate(planes):
+                planes[index], carry = plane ^ carry, plane & carry
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+        self.used = {}
+        for used in range(1, min(len(bitmaps) + 1, 1 << len(planes))):
+            bitmap = self.any
+            for index, plane in enumerate(planes):
+                bitmap &= plane if used >> index & 1 else ~plane
+            if bitmap:
+                self.used[used] = bitmap
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = popcount(self.any)
+        return self._count
+
+    def count(self):
+        return len(self)
+
+    def groups(self):
+        """Битовые карты групп с одинаковыми (missing, used)."""
+        for missing in range(max(self.totals, default=0)):
+            for used in sorted(self.used, reverse=True):
+                bitmap = self.used[used] & self.totals.get(used + missing, 0)
+                if bitmap:
+                    yield bitmap, used, missing
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('Поддерживаются только срезы.')
+        start, stop, _ = key.indices(len(self))
+        wanted = stop - start
+        result = []
+        for bitmap, used, missing in self.groups():
+            if len(result) >= wanted:
+                break
+            if start:
+                size = popcount(bitmap)
+                if start >= size:
+                    start -= size
+                    continue
+            for index, recipe_id in enumerate(iter_desc(bitmap)):
+                if len(result) >= wanted:
+                    break
+                if index >= start:
+                    result.append((recipe_id, used, missing))
+            start = 0
+        return result
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,33 @@
+"""
+Популярность рецептов: сумма весов добавлений в избранное и корзину,
+которая затухает командой decay_popularity.
+"""
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from recipes.models import Recipe
+
+FAVORITE_WEIGHT = 1.0
+SHOPPING_CART_WEIGHT = 0.5
+
+
+def add_popularity(recipe_id, weight):
+    """
+    Изменяет популярность рецепта атомарным UPDATE.
+    Значение ограничено нулем: затухание дискретно, и вычитаемый
+    вес (decayed_weight) может немного превышать оставшийся вклад.
+    """
+    Recipe.objects.filter(pk=recipe_id).update(popularity=Greatest(
+        F('popularity') + weight, Value(0.0), output_field=FloatField()))
+
+
+def decay_factor(hours, half_life_hours):
+    """Множитель затухания за hours часов."""
+    return 0.5 ** (hours / half_life_hours)
+
+
+def decayed_weight(weight, created_at):
+    """Оставшийся вклад события, добавленного в created_at."""
+    hours = max((timezone.now() - created_at).total_seconds() / 3600, 0)
+    return weight * decay_factor(hours, settings.POPULARITY_HALF_LIFE_HOURS)
@@ -0,0 +1,216 @@
+"""
+Профилирование отдельных запросов по требованию.
+
+Запрос профилируется, если в нем есть заголовок X-Profile: значение 1
+от пользователя с is_staff (сессия или токен) или подписанный токен
+из команды profiling_token. Без заголовка middleware сразу передает
+запрос дальше.
+
+X-Profile-Mode: sample (по умолчанию) - стеки собираются раз в
+PROFILING_SAMPLE_INTERVAL и пишутся в формате collapsed stacks
+(flamegraph.pl, speedscope); cprofile - детерминированный профиль
+cProfile (.prof). SQL-запросы записываются с местом вызова в коде
+проекта. Профили хранятся в PROFILING_DIR, старые удаляются, когда
+их больше PROFILING_KEEP. Имя профиля возвращается в X-Profile-Id.
+"""
+import cProfile
+import json
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from api.authentication import CachedTokenAuthentication
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+
+TOKEN_SALT = 'api.profiling'
+TOKEN_VALUE = 'profile'
+MODES = ('sample', 'cprofile')
+META_SUFFIX = '.json'
+
+
+def make_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(TOKEN_VALUE)
+
+
+def valid_token(value):
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            value, max_age=settings.PROFILING_TOKEN_MAX_AGE) == TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def is_staff(request):
+    """Сотрудник по сессии или по токену DRF (проверяется только здесь)."""
+    if request.user.is_authenticated:
+        return request.user.is_staff
+    try:
+        result = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+
+def short_path(filename):
+    """Путь относительно проекта или site-packages."""
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        return filename[len(base) + 1:]
+    _, marker, rest = filename.rpartition('site-packages/')
+    return rest if marker else filename
+
+
+def folded_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{short_path(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names)).replace(' ', '_')
+
+
+class StackSampler:
+    """Периодически снимает стек потока, обрабатывающего запрос."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[folded_stack(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.counts.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+class QueryRecorder:
+    """Обертка выполнения SQL: текст, время и место вызова в проекте."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.queries = []
+        self.count = 0
+        self.duration = 0.0
+        self.base = str(settings.BASE_DIR)
+
+    def origin(self):
+        return [
+            f'{short_path(frame.filename)}:{frame.lineno} {frame.name}'
+            for frame in traceback.extract_stack()
+            if frame.filename.startswith(self.base)
+            and frame.filename != __file__
+        ]
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if len(self.queries) < self.limit:
+                self.queries.append({
+                    'sql': sql,
+                    'duration_ms': round(duration * 1000, 3),
+                    'origin': self.origin(),
+                })
+
+
+def trim_profiles(directory, keep):
+    """Оставляет keep последних профилей (имена начинаются со времени)."""
+    metas = sorted(directory.glob(f'*{META_SUFFIX}'))
+    for meta in metas[:max(len(metas) - keep, 0)]:
+        profile_id = meta.name[:-len(META_SUFFIX)]
+        for path in directory.glob(f'{profile_id}.*'):
+            path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Профилирует запросы с заголовком X-Profile (см. модуль)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        value = request.META.get('HTTP_X_PROFILE')
+        if value is None:
+            return self.get_response(request)
+        if not (valid_token(value) if ':' in value
+                else value == '1' and is_staff(request)):
+            return self.get_response(request)
+        mode = request.META.get('HTTP_X_PROFILE_MODE', 'sample')
+        if mode not in MODES:
+            mode = 'sample'
+        return self.profile(request, mode)
+
+    def profile(self, request, mode):
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        profile_id = (f'{time.strftime("%Y%m%d-%H%M%S")}-'
+                      f'{uuid.uuid4().hex[:8]}')
+        recorder = QueryRecorder(settings.PROFILING_MAX_QUERIES)
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+        else:
+            profiler = StackSampler(threading.get_ident(),
+                                    settings.PROFILING_SAMPLE_INTERVAL)
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            if mode == 'cprofile':
+                profiler.enable()
+                stack.callback(profiler.disable)
+            else:
+                profiler.start()
+                stack.callback(profiler.stop)
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        if mode == 'cprofile':
+            profiler.dump_stats(directory / f'{profile_id}.prof')
+        else:
+            profiler.write(directory / f'{profile_id}.folded')
+        meta = {
+            'id': profile_id,
+            'mode': mode,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user': getattr(request.user, 'pk', None),
+            'duration_ms': round(duration * 1000, 3),
+            'sql_count': recorder.count,
+            'sql_duration_ms': round(recorder.duration * 1000, 3),
+            'queries': recorder.queries,
+        }
+        with open(directory / f'{profile_id}{META_SUFFIX}', 'w',
+                  encoding='utf-8') as file:
+            json.dump(meta, file, ensure_ascii=False, indent=2)
+        trim_profiles(directory, settings.PROFILING_KEEP)
+        response['X-Profile-Id'] = profile_id
+        return response
@@ -1,3 +1,5 @@
+from api.jobs import enqueue
+from api.shopping_cart import recipe_amounts, update_carted_recipe
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.validators import UnicodeUsernameValidator
@@ -6,7 +8,8 @@ from djoser.serializers import \
     UserCreateSerializer as DjoserUserCreateSerializer
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from recipes.models import Ingredient, Recipe, RecipeIngredient, ShortLink, Tag
+from recipes.models import (Ingredient, Job, Recipe, RecipeIngredient,
+                            ShortLink, Tag)
 from rest_framework import serializers
 from users.constants import MAX_LENGTH_USER_CHARFIELD
 from users.models import Follower
@@ -255,6 +258,8 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                     )
                 )
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        enqueue('index_recipes', {'recipe_ids': [recipe.id]})
+        enqueue('process_recipe_image', {'recipe_id': recipe.id})
         return recipe
 
     def create_ingredients(self, ingredients, recipe):
@@ -288,9 +293,14 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         if tags is not None:
             instance.tags.set(tags)
         if ingredients is not None:
+            old_amounts = recipe_amounts(instance.id)
             instance.ingredients.clear()
             self.create_ingredients(ingredients, instance)
+            update_carted_recipe(instance.id, old_amounts)
         instance.save()
+        enqueue('index_recipes', {'recipe_ids': [instance.id]})
+        if 'image' in validated_data:
+            enqueue('process_recipe_image', {'recipe_id': instance.id})
 
         return instance
 
@@ -359,3 +369,12 @@ class ShortLinkSerializer(serializers.ModelSerializer):
         return {
             'short-link': representation['short_link']
         }
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Состояние фоновой задачи пользователя."""
+
+    class Meta:
+        model = Job
+        fields = ('id', 'name', 'status', 'result', 'created_at',
+                  'finished_at')
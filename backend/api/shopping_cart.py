@@ -1,34 +1,125 @@
 from io import BytesIO
 
 from django.contrib.auth.models import User
-from django.db.models import Sum
-from recipes.models import Recipe, RecipeIngredient
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from recipes.models import (Recipe, RecipeIngredient, ShoppingCart,
+                            ShoppingListIngredient)
+
+
+def shopping_list_ingredients(user: User):
+    """Суммарное количество каждого ингредиента в корзине пользователя."""
+    return RecipeIngredient.objects.filter(
+        recipe__in=Recipe.objects.filter(in_shopping_carts__user=user)
+    ).values(
+        'ingredient__name',
+        'ingredient__measurement_unit'
+    ).annotate(
+        total_quantity=Sum('amount')
+    )
+
+
+def recipe_amounts(recipe_id):
+    """Количество каждого ингредиента в рецепте: {ingredient_id: amount}."""
+    amounts = {}
+    for ingredient_id, amount in RecipeIngredient.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', 'amount'):
+        amounts[ingredient_id] = amounts.get(ingredient_id, 0) + amount
+    return amounts
+
+
+@transaction.atomic
+def apply_shopping_list_delta(user_ids, delta):
+    """
+    Прибавляет delta ({ingredient_id: количество}) к спискам покупок
+    пользователей. Строки с нулевым количеством удаляются.
+    Недостающие строки вставляются с нулем (ON CONFLICT DO NOTHING),
+    поэтому параллельные транзакции с новым ингредиентом не нарушают
+    уникальность, а прибавление выполняется одним UPDATE.
+    """
+    delta = {key: value for key, value in delta.items() if value}
+    user_ids = list(user_ids)
+    if not delta or not user_ids:
+        return
+    ShoppingListIngredient.objects.bulk_create(
+        (ShoppingListIngredient(
+            user_id=user_id, ingredient_id=ingredient_id, total_amount=0)
+         for user_id in user_ids
+         for ingredient_id, amount in delta.items()
+         if amount > 0),
+        ignore_conflicts=True
+    )
+    items = ShoppingListIngredient.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=delta)
+    # Строки блокируются в одном порядке, чтобы параллельные
+    # изменения не приводили к взаимной блокировке.
+    list(items.select_for_update().order_by(
+        'user_id', 'ingredient_id').values_list('id', flat=True))
+    items.update(total_amount=F('total_amount') + Case(
+        *(When(ingredient_id=key, then=Value(value))
+          for key, value in delta.items()),
+        output_field=IntegerField()
+    ))
+    if any(value < 0 for value in delta.values()):
+        items.filter(total_amount__lte=0).delete()
+
+
+def add_recipe_to_shopping_list(user_id, recipe_id, sign=1):
+    """Учитывает добавление (sign=1) или удаление (sign=-1) рецепта."""
+    apply_shopping_list_delta([user_id], {
+        key: sign * value for key, value in recipe_amounts(recipe_id).items()
+    })
+
+
+def update_carted_recipe(recipe_id, old_amounts):
+    """
+    Переносит изменение ингредиентов рецепта в списки покупок
+    всех пользователей, у которых рецепт лежит в корзине.
+    """
+    new_amounts = recipe_amounts(recipe_id)
+    delta = {
+        key: new_amounts.get(key, 0) - old_amounts.get(key, 0)
+        for key in new_amounts.keys() | old_amounts.keys()
+    }
+    apply_shopping_list_delta(
+        ShoppingCart.objects.filter(
+            recipe_id=recipe_id).values_list('user_id', flat=True),
+        delta
+    )
+
+
+def expected_shopping_lists(using='default'):
+    """
+    Пересчитывает списки покупок всех пользователей по корзинам:
+    итератор (user_id, ingredient_id, total_amount).
+    """
+    return ShoppingCart.objects.using(using).filter(
+        recipe__ingredient_amounts__isnull=False
+    ).values_list(
+        'user_id', 'recipe__ingredient_amounts__ingredient_id'
+    ).annotate(
+        total=Sum('recipe__ingredient_amounts__amount')
+    ).order_by().iterator()
 
 
 def get_shopping_list(user: User) -> BytesIO:
     """
     Генерирует список покупок для пользователя.
     И возвращает его в виде объекта BytesIO.
+    Читает основную БД: файл сохраняется под текущей версией корзины.
     """
-    shopping_cart_recipes = Recipe.objects.filter(in_shopping_carts__user=user)
+    ingredients = ShoppingListIngredient.objects.using('default').filter(
+        user=user
+    ).order_by('ingredient__name').values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'total_amount')
 
-    if not shopping_cart_recipes.exists():
+    if not ingredients:
         raise ValueError("Список покупок пуст.")
 
-    ingredients = RecipeIngredient.objects.filter(
-        recipe__in=shopping_cart_recipes
-    ).values(
-        'ingredient__name',
-        'ingredient__measurement_unit'
-    ).annotate(
-        total_quantity=Sum('amount')
-    )
-
     file_content = "Необходимо купить:\n"
-    for item in ingredients:
-        file_content += (f"{item['ingredient__name']} - "
-                         f"{item['total_quantity']} "
-                         f"{item['ingredient__measurement_unit']}\n")
+    for name, measurement_unit, total_amount in ingredients:
+        file_content += f"{name} - {total_amount} {measurement_unit}\n"
 
     file_buffer = BytesIO(file_content.encode('utf-8'))
     return file_buffer
@@ -0,0 +1,178 @@
+"""
+Готовые файлы списка покупок (TXT и PDF) для скачивания.
+
+Файлы лежат в SHOPPING_LIST_CACHE_DIR/<user_id>/<версия>.<формат>.
+Версия корзины - случайная строка в файле version; она меняется после
+фиксации транзакции, изменившей корзину, рецепт из корзины или
+ингредиент списка. Скачивание актуального файла не обращается к БД.
+Файлы формируются по основной БД (using('default')): данные реплики
+могут отставать от версии, под которой файл сохраняется.
+Файлы в каталоге не должны быть доступны через /bmedia/: nginx отдает
+их только по X-Accel-Redirect.
+"""
+import os
+import shutil
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+from api.shopping_cart import get_shopping_list
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, HttpResponse
+from django.utils.crypto import get_random_string
+from django.utils.html import escape
+from django.utils.http import content_disposition_header
+from recipes.models import Recipe, ShoppingListIngredient
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+
+VERSION_FILE = 'version'
+PDF_FONT = 'ShoppingListFont'
+
+
+def render_txt(user_id):
+    return get_shopping_list(user_id).getvalue()
+
+
+@lru_cache(maxsize=None)
+def pdf_styles():
+    """Стили PDF со шрифтом с кириллицей (SHOPPING_LIST_PDF_FONT)."""
+    pdfmetrics.registerFont(TTFont(PDF_FONT, settings.SHOPPING_LIST_PDF_FONT))
+    styles = getSampleStyleSheet()
+    for style in styles.byName.values():
+        style.fontName = PDF_FONT
+    return styles
+
+
+def render_pdf(user_id):
+    """Таблица ингредиентов и список рецептов корзины."""
+    ingredients = list(ShoppingListIngredient.objects.using('default').filter(
+        user_id=user_id
+    ).order_by('ingredient__name').values_list(
+        'ingredient__name', 'total_amount', 'ingredient__measurement_unit'))
+    if not ingredients:
+        raise ValueError('Список покупок пуст.')
+    recipes = Recipe.objects.using('default').filter(
+        in_shopping_carts__user_id=user_id
+    ).order_by('name').values_list('name', flat=True)
+
+    styles = pdf_styles()
+    table = Table(
+        [('Ингредиент', 'Количество', 'Ед. изм.'), *ingredients],
+        colWidths=(100 * mm, 30 * mm, 40 * mm), repeatRows=1)
+    table.setStyle([
+        ('FONTNAME', (0, 0), (-1, -1), PDF_FONT),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
+    ])
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, title='Список покупок').build([
+        Paragraph('Список покупок', styles['Title']),
+        table,
+        Spacer(0, 8 * mm),
+        Paragraph('Рецепты', styles['Heading2']),
+        *(Paragraph(escape(name), styles['BodyText']) for name in recipes),
+    ])
+    return buffer.getvalue()
+
+
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_txt),
+    'pdf': ('application/pdf', render_pdf),
+}
+
+
+def user_dir(user_id):
+    return Path(settings.SHOPPING_LIST_CACHE_DIR) / str(user_id)
+
+
+def write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'.{path.name}.{get_random_string(8)}')
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+def new_version(user_id):
+    version = get_random_string(16)
+    write_atomic(user_dir(user_id) / VERSION_FILE, version.encode())
+    return version
+
+
+def current_version(user_id):
+    try:
+        return (user_dir(user_id) / VERSION_FILE).read_text()
+    except FileNotFoundError:
+        return new_version(user_id)
+
+
+def shopping_list_file(user_id, file_format):
+    """
+    Путь к файлу списка покупок текущей версии; файл создается при
+    первом обращении. ValueError, если список пуст.
+    Версия читается до данных: если корзина изменится во время
+    генерации, файл останется под старой версией.
+    """
+    path = user_dir(user_id) / f'{current_version(user_id)}.{file_format}'
+    if not path.exists():
+        write_atomic(path, FORMATS[file_format][1](user_id))
+    return path
+
+
+def invalidate(user_ids):
+    """
+    Меняет версию и удаляет старые файлы пользователей. Каталог без
+    файлов не создается: версия, записанная позже этой проверки,
+    записана уже после изменения данных.
+    """
+    for user_id in set(user_ids):
+        if not user_dir(user_id).exists():
+            continue
+        version = new_version(user_id)
+        for path in user_dir(user_id).iterdir():
+            # Временные файлы (с точкой) еще записываются.
+            if (path.name != VERSION_FILE and path.stem != version
+                    and not path.name.startswith('.')):
+                path.unlink(missing_ok=True)
+
+
+def invalidate_on_commit(user_ids):
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: invalidate(user_ids))
+
+
+def invalidate_all():
+    shutil.rmtree(settings.SHOPPING_LIST_CACHE_DIR, ignore_errors=True)
+
+
+def file_response(user_id, file_format):
+    """
+    Ответ с файлом списка покупок: X-Accel-Redirect для nginx, если
+    задан SHOPPING_LIST_ACCEL_REDIRECT, иначе FileResponse.
+    """
+    content_type = FORMATS[file_format][0]
+    filename = f'shopping_cart.{file_format}'
+    path = shopping_list_file(user_id, file_format)
+    if settings.SHOPPING_LIST_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.SHOPPING_LIST_ACCEL_REDIRECT
+            + path.relative_to(settings.SHOPPING_LIST_CACHE_DIR).as_posix())
+        response['Content-Disposition'] = content_disposition_header(
+            True, filename)
+        return response
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        # Файл удален изменением корзины после проверки.
+        file = open(shopping_list_file(user_id, file_format), 'rb')
+    return FileResponse(file, as_attachment=True, filename=filename,
+                        content_type=content_type)
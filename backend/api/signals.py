@@ -0,0 +1,160 @@
+from api.authentication import invalidate_tokens
+from api.conditional import touch_recipes
+from api.feed import (POPULAR_AUTHORS_KEY, backfill_feed, follower_count,
+                      left_popular, remove_from_feed)
+from api.jobs import enqueue
+from api.popularity import (FAVORITE_WEIGHT, SHOPPING_CART_WEIGHT,
+                            add_popularity, decayed_weight)
+from api.shopping_cart import add_recipe_to_shopping_list
+from api.shopping_list_files import invalidate_on_commit
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe, RecipeChange,
+                            ShoppingCart, ShoppingListIngredient, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import Follower
+
+User = get_user_model()
+
+POPULARITY_WEIGHTS = {
+    FavoriteRecipe: FAVORITE_WEIGHT,
+    ShoppingCart: SHOPPING_CART_WEIGHT,
+}
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Выход из системы (djoser token/logout) удаляет токен."""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    """Смена пароля, деактивация и другие изменения пользователя."""
+    invalidate_tokens(
+        Token.objects.filter(user=instance).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_added(sender, instance, created, **kwargs):
+    """Добавление рецепта в корзину (RecipeListMixin, админка)."""
+    if created:
+        add_recipe_to_shopping_list(instance.user_id, instance.recipe_id)
+        invalidate_on_commit([instance.user_id])
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_removed(sender, instance, **kwargs):
+    """
+    Удаление из корзины, в том числе каскадное при удалении рецепта:
+    pre_delete срабатывает, пока ингредиенты рецепта еще не удалены.
+    """
+    add_recipe_to_shopping_list(instance.user_id, instance.recipe_id, -1)
+    invalidate_on_commit([instance.user_id])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, signal, **kwargs):
+    """
+    Журнал для индексов рецептов в памяти воркеров (api.pantry)
+    и валидаторов условных запросов (api.conditional).
+    """
+    RecipeChange.objects.create(recipe_id=instance.id,
+                                deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Имя и аватар автора входят в ответ с его рецептами."""
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(ingredients=instance))
+        invalidate_on_commit(ShoppingListIngredient.objects.filter(
+            ingredient=instance).values_list('user_id', flat=True))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    invalidate_on_commit(ShoppingListIngredient.objects.filter(
+        ingredient=instance).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=Recipe)
+def carted_recipe_saved(sender, instance, created, **kwargs):
+    """Название и ингредиенты рецепта входят в файлы списка покупок."""
+    if not created:
+        invalidate_on_commit(ShoppingCart.objects.filter(
+            recipe=instance).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    """Новый рецепт попадает в ленты подписчиков (api.feed) в фоне."""
+    if created:
+        enqueue('fan_out_recipe', {'recipe_id': instance.id})
+
+
+@receiver(post_save, sender=Follower)
+def follower_added(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(pre_delete, sender=Follower)
+def follower_removing(sender, instance, **kwargs):
+    """
+    Число подписчиков до удаления. При массовом удалении pre_delete
+    всех объектов отправляется до удаления строк.
+    """
+    instance.followers_before = follower_count(instance.author_id)
+
+
+@receiver(post_delete, sender=Follower)
+def follower_removed(sender, instance, **kwargs):
+    """
+    Рецепты автора, переставшего быть популярным, записываются в ленты
+    подписчиков. Повторный проход после FEED_POPULAR_AUTHORS_TTL
+    добавляет рецепты, пропущенные воркерами со старым списком.
+    При массовом удалении задачи ставятся один раз на автора.
+    """
+    remove_from_feed(instance.user_id, instance.author_id)
+    before = getattr(instance, 'followers_before', 0)
+    after = follower_count(instance.author_id)
+    if left_popular(before, after) and cache.add(
+            f'feed_backfill:{instance.author_id}:{before}:{after}', True,
+            settings.FEED_POPULAR_AUTHORS_TTL):
+        cache.delete(POPULAR_AUTHORS_KEY)
+        for delay in (0, settings.FEED_POPULAR_AUTHORS_TTL):
+            enqueue('backfill_author_feed',
+                    {'author_id': instance.author_id}, delay=delay)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+def popularity_added(sender, instance, created, **kwargs):
+    if created:
+        add_popularity(instance.recipe_id, POPULARITY_WEIGHTS[sender])
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+def popularity_removed(sender, instance, **kwargs):
+    """Вычитается вклад события с учетом затухания, а не полный вес."""
+    add_popularity(instance.recipe_id, -decayed_weight(
+        POPULARITY_WEIGHTS[sender], instance.created_at))
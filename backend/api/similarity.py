@@ -0,0 +1,152 @@
+"""
+Поиск похожих рецептов по MinHash-сигнатурам множеств
+ингредиентов и тегов с LSH-индексом в БД.
+"""
+import hashlib
+import random
+import struct
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from recipes.models import (Recipe, RecipeBucket, RecipeIngredient,
+                            RecipeSignature)
+
+MERSENNE_PRIME = (1 << 61) - 1
+NUM_PERM = 64
+# 21 полоса по 3 строки (порог похожести ~(1/21)**(1/3) = 0.36).
+# Полосы по 2 строки давали корзины из тысяч рецептов с частыми
+# ингредиентами, и поиск кандидатов читал почти весь индекс.
+# После изменения нужна перестройка: build_similarity_index --full.
+BANDS = 21
+ROWS = 3
+# Рецепты-кандидаты с наибольшим числом общих корзин.
+MAX_CANDIDATES = 200
+# Теги и ингредиенты - разные элементы множества.
+TAG_OFFSET = 1 << 40
+
+SIGNATURE_FORMAT = f'<{NUM_PERM}Q'
+BAND_FORMAT = f'<H{ROWS}Q'
+
+_rng = random.Random(20240801)
+PERMUTATIONS = tuple(
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+)
+
+
+def minhash(features):
+    """MinHash-сигнатура множества целых чисел."""
+    return [min((a * x + b) % MERSENNE_PRIME for x in features)
+            for a, b in PERMUTATIONS]
+
+
+def band_buckets(signature):
+    """Хэши полос сигнатуры, номер полосы входит в хэш."""
+    buckets = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(
+            struct.pack(BAND_FORMAT, band,
+                        *signature[band * ROWS:(band + 1) * ROWS]),
+            digest_size=8
+        ).digest()
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+
+def estimate_similarity(signature, other):
+    """Оценка коэффициента Жаккара по доле совпавших значений."""
+    return sum(a == b for a, b in zip(signature, other)) / NUM_PERM
+
+
+def load_features(recipe_ids, using='default'):
+    """Множества ингредиентов и тегов рецептов: {recipe_id: set}."""
+    features = defaultdict(set)
+    for recipe_id, ingredient_id in RecipeIngredient.objects.using(
+        using
+    ).filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id'):
+        features[recipe_id].add(ingredient_id)
+    for recipe_id, tag_id in Recipe.tags.through.objects.using(
+        using
+    ).filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'tag_id'):
+        features[recipe_id].add(TAG_OFFSET + tag_id)
+    return features
+
+
+def compute_index(items):
+    """
+    Сигнатуры и корзины для пар (recipe_id, features).
+    Не обращается к БД, поэтому выполняется в пуле процессов.
+    """
+    result = []
+    for recipe_id, features in items:
+        signature = minhash(features)
+        result.append((recipe_id, struct.pack(SIGNATURE_FORMAT, *signature),
+                       band_buckets(signature)))
+    return result
+
+
+def save_index(rows, recipe_ids=None, using='default'):
+    """
+    Сохраняет результат compute_index. Прежние записи рецептов
+    recipe_ids (по умолчанию - из rows) удаляются.
+    """
+    if recipe_ids is None:
+        recipe_ids = [recipe_id for recipe_id, _, _ in rows]
+    signatures = RecipeSignature.objects.using(using)
+    buckets = RecipeBucket.objects.using(using)
+    with transaction.atomic(using=using):
+        signatures.filter(recipe_id__in=recipe_ids).delete()
+        buckets.filter(recipe_id__in=recipe_ids).delete()
+        signatures.bulk_create(
+            RecipeSignature(recipe_id=recipe_id, signature=signature)
+            for recipe_id, signature, _ in rows
+        )
+        buckets.bulk_create(
+            RecipeBucket(recipe_id=recipe_id, bucket=bucket)
+            for recipe_id, _, recipe_buckets in rows
+            for bucket in recipe_buckets
+        )
+
+
+def index_recipes(recipe_ids):
+    """Пересчитывает индекс для изменившихся рецептов."""
+    features = load_features(recipe_ids)
+    save_index(compute_index(features.items()), recipe_ids)
+
+
+def similar_recipe_ids(recipe_id, limit):
+    """
+    Id похожих рецептов в порядке убывания похожести.
+    Рецепт без сигнатуры (еще не проиндексирован) похожих не имеет.
+    """
+    candidates = list(RecipeBucket.objects.filter(
+        bucket__in=RecipeBucket.objects.filter(
+            recipe_id=recipe_id).values('bucket')
+    ).exclude(
+        recipe_id=recipe_id
+    ).values('recipe_id').annotate(
+        shared=Count('id')
+    ).order_by('-shared', '-recipe_id').values_list(
+        'recipe_id', flat=True)[:MAX_CANDIDATES])
+    if not candidates:
+        return []
+    signatures = {
+        pk: struct.unpack(SIGNATURE_FORMAT, signature)
+        for pk, signature in RecipeSignature.objects.filter(
+            recipe_id__in=[recipe_id, *candidates]
+        ).values_list('recipe_id', 'signature')
+    }
+    signature = signatures.pop(recipe_id, None)
+    if signature is None:
+        return []
+    scored = sorted(
+        ((estimate_similarity(signature, other), pk)
+         for pk, other in signatures.items()),
+        reverse=True
+    )
+    return [pk for _, pk in scored[:limit]]
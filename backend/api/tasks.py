@@ -0,0 +1,70 @@
+"""Фоновые задачи (api.jobs), вынесенные из обработки запросов."""
+from io import BytesIO
+
+from api.conditional import touch_recipes
+from api.feed import backfill_author, fan_out_recipe
+from api.jobs import task
+from api.shopping_list_files import shopping_list_file
+from api.similarity import index_recipes
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from PIL import Image
+from recipes.models import Recipe
+
+
+@task('shopping_list_file', priority=10, max_attempts=1)
+def shopping_list_file_task(user_id, file_format='txt'):
+    """Готовит файл списка покупок и возвращает адрес для скачивания."""
+    shopping_list_file(user_id, file_format)
+    return {'url': reverse('recipes-download-shopping-cart')
+            + f'?type={file_format}'}
+
+
+@task('index_recipes', priority=5)
+def index_recipes_task(recipe_ids):
+    index_recipes(recipe_ids)
+
+
+@task('fan_out_recipe')
+def fan_out_recipe_task(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'id', 'author_id').first()
+    if recipe is not None:
+        fan_out_recipe(recipe)
+
+
+@task('backfill_author_feed')
+def backfill_author_feed_task(author_id):
+    backfill_author(author_id)
+
+
+@task('process_recipe_image', queue='media', timeout=120)
+def process_recipe_image(recipe_id):
+    """
+    Уменьшает картинку рецепта до RECIPE_IMAGE_MAX_SIDE по большей
+    стороне. Старый файл удаляется, если картинку не заменили
+    за время обработки.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return {'resized': False}
+    max_side = settings.RECIPE_IMAGE_MAX_SIDE
+    with recipe.image.open('rb') as file, Image.open(file) as image:
+        if max(image.size) <= max_side:
+            return {'resized': False}
+        image_format = image.format
+        image.thumbnail((max_side, max_side))
+        buffer = BytesIO()
+        image.save(buffer, format=image_format, optimize=True,
+                   **({'quality': 85} if image_format == 'JPEG' else {}))
+
+    old_name = recipe.image.name
+    storage = recipe.image.storage
+    new_name = storage.save(old_name, ContentFile(buffer.getvalue()))
+    updated = Recipe.objects.filter(pk=recipe_id, image=old_name).update(
+        image=new_name)
+    storage.delete(old_name if updated else new_name)
+    if updated:
+        touch_recipes(Recipe.objects.filter(pk=recipe_id))
+    return {'resized': bool(updated), 'image': new_name}
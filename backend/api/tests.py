@@ -0,0 +1,92 @@
+from api.benchmarks.base import annotated_recipes, make_request
+from api.fast_recipes import RECIPE_FIELDS, recipe_row, render_recipes
+from api.serializers import RecipeGetSerializer
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from users.models import Follower
+
+User = get_user_model()
+
+
+class FastRecipeRendererTests(TestCase):
+    """
+    api.fast_recipes должен формировать побайтно тот же JSON, что и
+    RecipeGetSerializer (полная проверка на базе — check_recipe_renderer).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass',
+            first_name='Автор', last_name='Рецептов', avatar='users/a.png')
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass',
+            first_name='Читатель', last_name='Рецептов')
+        Follower.objects.create(user=cls.reader, author=cls.author)
+        breakfast = Tag.objects.create(name='Завтрак', slug='breakfast')
+        dinner = Tag.objects.create(name='Ужин', slug='dinner')
+        eggs = Ingredient.objects.create(name='яйца', measurement_unit='шт')
+        milk = Ingredient.objects.create(name='молоко', measurement_unit='мл')
+        omelette = Recipe.objects.create(
+            author=cls.author, name='Омлет', image='recipes/omelette.png',
+            text='Взбить и пожарить.', cooking_time=10)
+        omelette.tags.set((dinner, breakfast))
+        RecipeIngredient.objects.create(
+            recipe=omelette, ingredient=milk, amount=100)
+        RecipeIngredient.objects.create(
+            recipe=omelette, ingredient=eggs, amount=3)
+        porridge = Recipe.objects.create(
+            author=cls.reader, name='Каша', image='recipes/porridge.png',
+            text='Варить на молоке.', cooking_time=20)
+        porridge.tags.set((breakfast,))
+        RecipeIngredient.objects.create(
+            recipe=porridge, ingredient=milk, amount=500)
+        FavoriteRecipe.objects.create(user=cls.reader, recipe=omelette)
+        ShoppingCart.objects.create(user=cls.reader, recipe=porridge)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameJSON(self, expected, actual):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(expected), renderer.render(actual))
+
+    def test_rows_match_serializer(self):
+        for user in (AnonymousUser(), self.reader):
+            with self.subTest(user=user):
+                request = make_request(user)
+                queryset = annotated_recipes(user).order_by('-id')
+                expected = RecipeGetSerializer(
+                    queryset, many=True, context={'request': request}).data
+                self.assertSameJSON(expected, render_recipes(
+                    queryset.values(*RECIPE_FIELDS), request))
+
+    def test_recipe_row_matches_serializer(self):
+        request = make_request(self.reader)
+        for recipe in annotated_recipes(self.reader):
+            with self.subTest(recipe=recipe.name):
+                expected = RecipeGetSerializer(
+                    recipe, context={'request': request}).data
+                self.assertSameJSON(
+                    expected, render_recipes([recipe_row(recipe)], request)[0])
+
+    def test_endpoints_match_with_renderer_disabled(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        recipe_id = Recipe.objects.get(name='Омлет').id
+        for path in ('/api/recipes/', f'/api/recipes/{recipe_id}/'):
+            responses = []
+            for fast in (True, False):
+                cache.clear()
+                with override_settings(RECIPE_FAST_RENDERER=fast):
+                    response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                responses.append(response.content)
+            with self.subTest(path=path):
+                self.assertEqual(*responses)
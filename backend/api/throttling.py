@@ -0,0 +1,114 @@
+"""
+Ограничение частоты запросов алгоритмом token bucket.
+
+Корзина вмещает N запросов и пополняется равномерно за период, то есть
+ставка '60/min' разрешает всплеск из 60 запросов и затем 1 запрос в
+секунду. Корзина реализована как GCRA: в кэше хранится одно целое
+число - теоретическое время следующего запроса (TAT, мкс). Запрос
+атомарно сдвигает его на интервал (cache.add для пустой корзины,
+cache.incr для остальных), отклоненный запрос возвращает сдвиг
+cache.decr, поэтому параллельные запросы одного клиента не тратят
+больше емкости корзины. Атомарность обеспечивает кэш: Redis и Memcached
+атомарны между воркерами, LocMemCache - внутри процесса.
+Ключ - пользователь, для анонимов - IP-адрес.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'60/min' -> (60, 60.0): емкость корзины и период в секундах."""
+    if rate is None:
+        return None
+    capacity, period = rate.split('/')
+    return int(capacity), float(DURATIONS[period[0]])
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Ограничение по областям (scope). Область задается атрибутом scope,
+    словарем throttle_scopes представления по имени action или
+    областью write для изменяющих запросов. Ставка анонимов
+    берется из '<scope>_anon', если она задана.
+    """
+
+    scope = None
+    write_scope = 'write'
+    cache_prefix = 'throttle'
+
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        self.rates = api_settings.DEFAULT_THROTTLE_RATES
+        self.wait_seconds = None
+
+    def get_scope(self, request, view):
+        if self.scope is not None:
+            return self.scope
+        scopes = getattr(view, 'throttle_scopes', {})
+        scope = scopes.get(getattr(view, 'action', None))
+        if scope is None and request.method not in SAFE_METHODS:
+            scope = self.write_scope
+        return scope
+
+    def get_rate(self, scope, request):
+        if not request.user.is_authenticated:
+            rate = self.rates.get(f'{scope}_anon')
+            if rate is not None:
+                return parse_rate(rate)
+        return parse_rate(self.rates.get(scope))
+
+    def get_cache_key(self, scope, request):
+        if request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'{self.cache_prefix}:{scope}:{ident}'
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED:
+            return True
+        scope = self.get_scope(request, view)
+        if scope is None:
+            return True
+        rate = self.get_rate(scope, request)
+        if rate is None:
+            return True
+        capacity, period = rate
+        interval = int(period / capacity * 1e6)
+        period = int(period * 1e6)
+
+        key = self.get_cache_key(scope, request)
+        now = int(time.time() * 1e6)
+        # Запись живет, пока корзина не наполнится снова: после этого
+        # следующий запрос начинает с полной корзины.
+        if self.cache.add(key, now + interval, math.ceil(interval / 1e6)):
+            return True
+        try:
+            tat = self.cache.incr(key, interval)
+        except ValueError:
+            # Запись истекла между add и incr.
+            self.cache.add(key, now + interval, math.ceil(interval / 1e6))
+            return True
+        if tat - now > period:
+            self.cache.decr(key, interval)
+            self.wait_seconds = (tat - now - period) / 1e6
+            return False
+        self.cache.touch(key, math.ceil((tat - now) / 1e6))
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ShortLinkThrottle(TokenBucketThrottle):
+    """Создание коротких ссылок (функциональное представление)."""
+
+    scope = 'shortlink'
@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet,
-                    get_short_link)
+from .views import (IngredientViewSet, JobViewSet, RecipeViewSet, TagViewSet,
+                    UserViewSet, get_short_link)
 
 router_v1 = DefaultRouter()
 
@@ -10,6 +10,7 @@ router_v1.register('tags', TagViewSet, basename='tags')
 router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register('users', UserViewSet, basename='user')
 router_v1.register('recipes', RecipeViewSet, basename='recipes')
+router_v1.register('jobs', JobViewSet, basename='jobs')
 
 
 urlpatterns = [
@@ -1,28 +1,45 @@
+from api.conditional import (detail_validators, list_validators, not_modified,
+                             set_validators)
+from api.fast_recipes import RECIPE_FIELDS, recipe_row, render_recipes
+from api.feed import feed_recipe_ids
 from api.filters import IngredientFilter, RecipeFilter
+from api.jobs import enqueue
 from api.mixins import RecipeListMixin
 from api.pagination import LimitPagePagination
+from api.pantry import pantry_index
 from api.permissions import IsAuthorOrReadOnly
 from api.serializers import (AvatarUserSerializer, IngredientSerializer,
-                             RecipeCreateSerializer, RecipeGetSerializer,
-                             ShortLinkSerializer, SubscriptionSerializer,
-                             TagSerializer)
-from api.shopping_cart import get_shopping_list
+                             JobSerializer, RecipeCreateSerializer,
+                             RecipeGetSerializer, ShortLinkSerializer,
+                             SubscriptionSerializer, TagSerializer)
+from api.shopping_list_files import FORMATS, file_response
+from api.similarity import similar_recipe_ids
+from api.throttling import ShortLinkThrottle
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import BooleanField, Exists, OuterRef, Value
-from django.http import FileResponse
 from django.shortcuts import get_object_or_404, redirect
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
-from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
-                            ShortLink, Tag)
-from rest_framework import status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from foodgram.db_router import primary_only
+from recipes.models import (FavoriteRecipe, Ingredient, Job, Recipe,
+                            ShoppingCart, ShoppingListIngredient, ShortLink,
+                            Tag)
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
 from users.models import Follower
 
 User = get_user_model()
 
+MAX_SIMILAR = 30
+MAX_PANTRY_INGREDIENTS = 100
+MAX_FEED = 50
+
 
 class UserViewSet(DjoserUserViewSet):
     """
@@ -131,9 +148,12 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    throttle_scopes = {'list': 'search'}
 
 
 @api_view(['GET'])
+@throttle_classes([ShortLinkThrottle])
+@primary_only
 def get_short_link(request, recipe_id):
     """
     Получение или создание короткой ссылки для рецепта.
@@ -161,6 +181,11 @@ class RecipeViewSet(RecipeListMixin, viewsets.ModelViewSet):
     pagination_class = LimitPagePagination
     filterset_class = RecipeFilter
     filter_backends = (DjangoFilterBackend,)
+    throttle_scopes = {
+        'pantry': 'search',
+        'get_link': 'shortlink',
+        'download_shopping_cart': 'download',
+    }
 
     def get_queryset(self):
         queryset = Recipe.objects.all()
@@ -186,8 +211,121 @@ class RecipeViewSet(RecipeListMixin, viewsets.ModelViewSet):
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список с поддержкой If-None-Match/If-Modified-Since: до
+        формирования ответа проверяется max(updated_at) рецептов.
+        Порядок по популярности меняется без изменения рецептов,
+        поэтому для него валидаторы не используются.
+        """
+        etag = last_modified = None
+        if request.query_params.get('ordering') != 'popular':
+            etag, last_modified = list_validators(request.user)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        if not settings.RECIPE_FAST_RENDERER:
+            response = super().list(request, *args, **kwargs)
+        else:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset.values(*RECIPE_FIELDS))
+            response = self.get_paginated_response(
+                render_recipes(page, request))
+        return set_validators(request, response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = detail_validators(
+            self.kwargs['pk'], request.user)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        if not settings.RECIPE_FAST_RENDERER:
+            response = super().retrieve(request, *args, **kwargs)
+        else:
+            data = render_recipes([recipe_row(self.get_object())], request)
+            response = Response(data[0])
+        return set_validators(request, response, etag, last_modified)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Похожие рецепты по ингредиентам и тегам из индекса
+        build_similarity_index. Количество задается параметром limit.
+        """
+        recipe = self.get_object()
+        limit = request.query_params.get('limit', '')
+        limit = min(int(limit), MAX_SIMILAR) if limit.isdigit() else 6
+        ids = similar_recipe_ids(recipe.id, limit)
+        queryset = self.get_queryset().filter(id__in=ids)
+        if settings.RECIPE_FAST_RENDERER:
+            rows = sorted(queryset.values(*RECIPE_FIELDS),
+                          key=lambda row: ids.index(row['id']))
+            return Response(render_recipes(rows, request))
+        recipes = sorted(queryset, key=lambda recipe: ids.index(recipe.id))
+        return Response(self.get_serializer(recipes, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def pantry(self, request):
+        """
+        Рецепты из имеющихся ингредиентов ?ingredients=1,2,3: сначала те,
+        для которых не хватает меньше всего ингредиентов.
+        """
+        values = ','.join(request.query_params.getlist('ingredients'))
+        values = [value for value in values.split(',') if value]
+        if (not values or len(values) > MAX_PANTRY_INGREDIENTS
+                or not all(value.isdigit() for value in values)):
+            return Response(
+                {'ingredients': [
+                    'Укажите от 1 до {} id ингредиентов через запятую.'
+                    .format(MAX_PANTRY_INGREDIENTS)]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        pantry_index.refresh()
+        page = self.paginate_queryset(
+            pantry_index.search(map(int, values)))
+        ids = [recipe_id for recipe_id, _, _ in page]
+        queryset = self.get_queryset().filter(id__in=ids)
+        if settings.RECIPE_FAST_RENDERER:
+            data = render_recipes(sorted(
+                queryset.values(*RECIPE_FIELDS),
+                key=lambda row: ids.index(row['id'])), request)
+        else:
+            data = self.get_serializer(sorted(
+                queryset, key=lambda recipe: ids.index(recipe.id)),
+                many=True).data
+        counts = {recipe_id: (used, missing)
+                  for recipe_id, used, missing in page}
+        for item in data:
+            item['used_ingredients'], item['missing_ingredients'] = (
+                counts[item['id']])
+        return self.get_paginated_response(data)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """
+        Рецепты авторов из подписок, новые первыми. Следующая страница
+        запрашивается по ссылке next (?before=<id последнего рецепта>).
+        """
+        limit = request.query_params.get('limit', '')
+        limit = (min(int(limit), MAX_FEED) if limit.isdigit() and int(limit)
+                 else self.paginator.page_size)
+        before = request.query_params.get('before', '')
+        before = int(before) if before.isdigit() else None
+        ids = feed_recipe_ids(request.user, limit, before)
+        queryset = self.get_queryset().filter(id__in=ids)
+        if settings.RECIPE_FAST_RENDERER:
+            results = render_recipes(queryset.values(*RECIPE_FIELDS), request)
+        else:
+            results = self.get_serializer(queryset, many=True).data
+        next_url = None
+        if len(ids) == limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'before', ids[-1])
+        return Response({'next': next_url, 'results': results})
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'similar', 'pantry', 'feed'):
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
@@ -229,6 +367,7 @@ class RecipeViewSet(RecipeListMixin, viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'],
             permission_classes=[AllowAny])
+    @primary_only
     def get_link(self, request, pk=None):
         """Получить короткую ссылку на рецепт."""
         recipe = self.get_object()
@@ -238,21 +377,52 @@ class RecipeViewSet(RecipeListMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated])
+    @primary_only
     def download_shopping_cart(self, request):
         """
         Скачивание списка покупок для авторизованного
-        пользователя в формате TXT.
+        пользователя в формате TXT или PDF (?type=pdf). Готовый файл
+        отдается без запросов к БД, пока корзина не изменилась.
+        С заголовком Prefer: respond-async файл готовится в фоне:
+        ответ 202 со ссылкой на задачу.
         """
         user = request.user
+        file_format = request.query_params.get('type', 'txt')
+        if file_format not in FORMATS:
+            return Response(
+                {'type': f'Допустимые значения: {", ".join(FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if 'respond-async' in request.headers.get('Prefer', ''):
+            if not ShoppingListIngredient.objects.filter(user=user).exists():
+                return Response(
+                    {'detail': 'Ваш список покупок пуст.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            job = enqueue('shopping_list_file',
+                          {'user_id': user.id, 'file_format': file_format},
+                          user=user)
+            location = reverse('jobs-detail', args=(job.id,),
+                               request=request)
+            return Response(JobSerializer(job).data,
+                            status=status.HTTP_202_ACCEPTED,
+                            headers={'Location': location})
 
         try:
-            file_buffer = get_shopping_list(user)
+            return file_response(user.id, file_format)
         except ValueError:
             return Response(
                 {'detail': 'Ваш список покупок пуст.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        return FileResponse(file_buffer,
-                            as_attachment=True,
-                            filename='shopping_cart.txt')
+
+class JobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Состояние фоновых задач текущего пользователя."""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
@@ -0,0 +1,115 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from api.authentication import CachedTokenAuthentication
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_COOKIE = 'db_primary_pin'
+
+use_replica = ContextVar('use_replica', default=False)
+pin_primary = ContextVar('pin_primary', default=False)
+
+
+def pin_cache_key(user_id):
+    return f'db_primary_pin:{user_id}'
+
+
+def primary_only(func):
+    """
+    Для GET-представлений, которые пишут в БД: чтение из основной БД,
+    после ответа клиент закрепляется за ней, как после записи.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = use_replica.set(False)
+        pin_primary.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            use_replica.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение на реплики, если ReplicaMiddleware разрешил это
+    для текущего запроса. Запись и миграции всегда идут в default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if use_replica.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaMiddleware:
+    """
+    Разрешает чтение с реплик для GET/HEAD-запросов.
+    После записи пользователь на REPLICA_PIN_SECONDS закрепляется за
+    основной БД в кэше REPLICA_PIN_CACHE_ALIAS (для всех его клиентов
+    и токенов), анонимный клиент - через cookie.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def user_id(request):
+        """
+        Пользователь по сессии или токену; до решения о репликах
+        токен при промахе кэша читается из основной БД.
+        """
+        if request.user.is_authenticated:
+            return request.user.pk
+        try:
+            result = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        return None if result is None else result[0].pk
+
+    def pinned(self, request):
+        if PIN_COOKIE in request.COOKIES:
+            return True
+        user_id = self.user_id(request)
+        return user_id is not None and caches[
+            settings.REPLICA_PIN_CACHE_ALIAS].get(pin_cache_key(user_id))
+
+    def __call__(self, request):
+        replica = bool(
+            settings.DATABASE_REPLICAS
+            and request.method in ('GET', 'HEAD')
+            and not self.pinned(request)
+        )
+        replica_token = use_replica.set(replica)
+        pin_token = pin_primary.set(request.method not in SAFE_METHODS)
+        try:
+            response = self.get_response(request)
+            pin = pin_primary.get()
+        finally:
+            use_replica.reset(replica_token)
+            pin_primary.reset(pin_token)
+
+        if pin and response.status_code < 400 and settings.DATABASE_REPLICAS:
+            user_id = self.user_id(request)
+            if user_id is not None:
+                caches[settings.REPLICA_PIN_CACHE_ALIAS].set(
+                    pin_cache_key(user_id), True,
+                    settings.REPLICA_PIN_SECONDS)
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax'
+            )
+        return response
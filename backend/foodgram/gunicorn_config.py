@@ -0,0 +1,113 @@
+"""
+Конфигурация gunicorn для production.
+
+Запуск: gunicorn -c python:foodgram.gunicorn_config foodgram.wsgi
+Все параметры можно переопределить переменными окружения GUNICORN_*.
+"""
+import gc
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+
+CONFIG_LOADED_AT = time.monotonic()
+
+
+def cpu_count():
+    """Количество ядер, доступных процессу (учитывает cpuset контейнера)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def memory_usage_kb():
+    """RSS и PSS текущего процесса в килобайтах (только Linux)."""
+    usage = {}
+    for path, keys in (('/proc/self/status', ('VmRSS',)),
+                       ('/proc/self/smaps_rollup', ('Pss',))):
+        try:
+            with open(path) as file:
+                for line in file:
+                    key, _, value = line.partition(':')
+                    if key in keys:
+                        usage[key] = int(value.split()[0])
+        except OSError:
+            continue
+    return usage
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:9090')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Синхронным воркерам нужен запас процессов на ожидание БД,
+# gthread-воркеры ждут БД в потоках.
+workers = int(os.getenv(
+    'GUNICORN_WORKERS',
+    cpu_count() * 2 + 1 if worker_class == 'sync' else cpu_count() + 1
+))
+
+# Приложение загружается до fork, воркеры разделяют
+# импортированные модули в режиме copy-on-write.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+worker_tmp_dir = os.getenv('GUNICORN_WORKER_TMP_DIR', '/dev/shm')
+accesslog = os.getenv('GUNICORN_ACCESSLOG', None)
+
+
+def on_starting(server):
+    from api.metrics import clear_metrics_dir
+
+    clear_metrics_dir()
+
+
+def when_ready(server):
+    if preload_app and os.getenv('GUNICORN_PRELOAD_PANTRY', 'True') == 'True':
+        # Индекс ингредиентов строится один раз в мастере и достается
+        # воркерам через fork; соединения с БД не должны переходить в них.
+        # Если БД недоступна или миграции еще не применены, индекс
+        # загрузится в каждом воркере при первом поиске.
+        from api.pantry import pantry_index
+        from django.db import DatabaseError, connections
+
+        try:
+            pantry_index.refresh()
+        except DatabaseError as error:
+            server.log.warning('Pantry index is not preloaded: %s', error)
+        finally:
+            connections.close_all()
+    # Объекты, созданные при загрузке приложения, исключаются из сборки
+    # мусора: gc не трогает их страницы памяти, и они остаются общими.
+    gc.freeze()
+    server.log.info(
+        'Startup time: %.2f s, master memory: %s',
+        time.monotonic() - CONFIG_LOADED_AT, memory_usage_kb())
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    worker.log.info(
+        'Worker %s ready in %.3f s, memory: %s', worker.pid,
+        time.monotonic() - worker.forked_at, memory_usage_kb())
+
+
+def worker_exit(server, worker):
+    from api.metrics import registry
+
+    worker.log.info('Worker %s exiting, memory: %s',
+                    worker.pid, memory_usage_kb())
+    registry.flush()
+
+
+def child_exit(server, worker):
+    from api.metrics import archive_worker
+
+    archive_worker(worker.pid)
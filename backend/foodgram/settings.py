@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -40,11 +41,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'foodgram.db_router.ReplicaMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,10 +85,41 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Постоянные соединения вместо нового подключения на каждый запрос.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        # pgbouncer в режиме transaction не поддерживает
+        # серверные курсоры.
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_PGBOUNCER', 'False') == 'True',
     }
 }
 
+# Реплики для чтения: DB_REPLICA_HOSTS=host1:5432,host2
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))
+):
+    host, _, port = replica.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+# Сколько секунд после записи клиент читает только из основной БД.
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+# Кэш закреплений пользователей: с LocMemCache закрепление действует
+# только в воркере, обработавшем запись.
+REPLICA_PIN_CACHE_ALIAS = 'default'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -139,7 +175,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -148,8 +184,116 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    # Емкость корзины / период пополнения (api.throttling).
+    'DEFAULT_THROTTLE_RATES': {
+        'search': os.getenv('THROTTLE_RATE_SEARCH', '120/min'),
+        'search_anon': os.getenv('THROTTLE_RATE_SEARCH_ANON', '60/min'),
+        'write': os.getenv('THROTTLE_RATE_WRITE', '60/min'),
+        'write_anon': os.getenv('THROTTLE_RATE_WRITE_ANON', '20/min'),
+        'shortlink': os.getenv('THROTTLE_RATE_SHORTLINK', '30/min'),
+        'shortlink_anon': os.getenv('THROTTLE_RATE_SHORTLINK_ANON', '10/min'),
+        'download': os.getenv('THROTTLE_RATE_DOWNLOAD', '10/min'),
+    },
+    # Число прокси перед приложением: nginx из docker-compose и,
+    # если он есть, nginx на хосте (THROTTLE_NUM_PROXIES=2).
+    'NUM_PROXIES': int(os.getenv('THROTTLE_NUM_PROXIES', 1)),
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Ограничение частоты запросов. С LocMemCache корзины у каждого
+# воркера свои; общий лимит дает общий кэш (Redis, Memcached).
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Кэш токенов: LRU процесса и общий кэш (если это не LocMemCache).
+TOKEN_CACHE_ALIAS = 'default'
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 4096))
+TOKEN_CACHE_LOCAL_TTL = int(os.getenv('TOKEN_CACHE_LOCAL_TTL', 5))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 300))
+
+# Сериализация JSON через orjson; API_JSON_BACKEND=stdlib
+# возвращает стандартные классы DRF.
+if os.getenv('API_JSON_BACKEND', 'orjson') == 'orjson':
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
+# Списки и карточки рецептов формируются без полей DRF
+# (api.fast_recipes), формат ответа совпадает с RecipeGetSerializer.
+RECIPE_FAST_RENDERER = os.getenv('RECIPE_FAST_RENDERER', 'True') == 'True'
+
+# Как часто (сек.) индекс ингредиентов воркера читает журнал изменений.
+PANTRY_INDEX_REFRESH = float(os.getenv('PANTRY_INDEX_REFRESH', 5))
+# Сколько часов хранится журнал изменений рецептов
+# (команда prune_recipe_changes).
+RECIPE_CHANGES_KEEP_HOURS = float(os.getenv('RECIPE_CHANGES_KEEP_HOURS', 24))
+
+# Рецепты авторов с большим числом подписчиков не раскладываются по лентам,
+# а читаются при запросе ленты.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 1000))
+FEED_POPULAR_AUTHORS_TTL = int(os.getenv('FEED_POPULAR_AUTHORS_TTL', 300))
+
+# Период полураспада популярности рецепта в часах.
+POPULARITY_HALF_LIFE_HOURS = float(
+    os.getenv('POPULARITY_HALF_LIFE_HOURS', 72))
+
+# Сжатие ответов API (api.compression). Brotli - при установленном
+# пакете brotli. Справочники сжимаются один раз с максимальной степенью.
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 5))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+COMPRESSION_PRECOMPRESS_PATHS = ('/api/tags/', '/api/ingredients/')
+
+# Очередь фоновых задач (api.jobs, команда run_worker). С JOBS_RUN_INLINE
+# задачи выполняются сразу в процессе веб-сервера (разработка без воркера).
+JOBS_RUN_INLINE = os.getenv('JOBS_RUN_INLINE', 'False') == 'True'
+JOBS_VISIBILITY_TIMEOUT = int(os.getenv('JOBS_VISIBILITY_TIMEOUT', 300))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 10))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 1))
+JOBS_PURGE_INTERVAL = int(os.getenv('JOBS_PURGE_INTERVAL', 3600))
+JOBS_KEEP_FINISHED = int(os.getenv('JOBS_KEEP_FINISHED', 7 * 24 * 3600))
+
+# Картинки рецептов больше этого размера (px) уменьшаются в фоне.
+RECIPE_IMAGE_MAX_SIDE = int(os.getenv('RECIPE_IMAGE_MAX_SIDE', 1600))
+
+# Готовые файлы списка покупок (api.shopping_list_files). Каталог не
+# должен раздаваться как /bmedia/. С SHOPPING_LIST_ACCEL_REDIRECT файл
+# отдает nginx (internal location с alias на этот каталог). По умолчанию
+# каталог во временной директории, вне дерева исходников: файлы
+# пересоздаются по запросу.
+SHOPPING_LIST_CACHE_DIR = os.getenv(
+    'SHOPPING_LIST_CACHE_DIR',
+    str(Path(tempfile.gettempdir()) / 'foodgram_shopping_lists'))
+SHOPPING_LIST_ACCEL_REDIRECT = os.getenv('SHOPPING_LIST_ACCEL_REDIRECT', '')
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
+# Профилирование запросов с заголовком X-Profile (api.profiling).
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_KEEP = int(os.getenv('PROFILING_KEEP', 50))
+PROFILING_SAMPLE_INTERVAL = float(
+    os.getenv('PROFILING_SAMPLE_INTERVAL', 0.001))
+PROFILING_MAX_QUERIES = int(os.getenv('PROFILING_MAX_QUERIES', 1000))
+PROFILING_TOKEN_MAX_AGE = int(os.getenv('PROFILING_TOKEN_MAX_AGE', 3600))
+
 DJOSER = {
     'USER_ID_FIELD': 'id',
     'LOGIN_FIELD': 'email',
@@ -167,3 +311,9 @@ DJOSER = {
 }
 
 AUTH_USER_MODEL = 'users.User'
+
+# Метрики для Prometheus: каждый воркер gunicorn сбрасывает свои
+# счетчики в METRICS_DIR, а /metrics объединяет их.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR', '/tmp/foodgram_metrics')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from foodgram.db_router import (PIN_COOKIE, ReplicaMiddleware, primary_only,
+                                use_replica)
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_PIN_SECONDS=5)
+class ReplicaMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass',
+            first_name='Имя', last_name='Фамилия')
+        cls.other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass',
+            first_name='Имя', last_name='Фамилия')
+        cls.token = Token.objects.create(user=cls.user)
+        cls.other_token = Token.objects.create(user=cls.other)
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def request(self, method, token=None, view=None):
+        """Запрос через middleware; возвращает (ответ, чтение с реплики)."""
+        seen = {}
+        headers = {'HTTP_AUTHORIZATION': f'Token {token.key}'} if token else {}
+        request = getattr(self.factory, method)('/api/recipes/', **headers)
+        request.user = AnonymousUser()
+
+        def get_response(request):
+            seen['replica'] = use_replica.get()
+            if view is not None:
+                seen['view_replica'] = view()
+            return HttpResponse()
+
+        response = ReplicaMiddleware(get_response)(request)
+        return response, seen
+
+    def test_anonymous_get_reads_replica(self):
+        _, seen = self.request('get')
+        self.assertTrue(seen['replica'])
+
+    def test_write_pins_user_for_all_clients(self):
+        response, seen = self.request('post', self.token)
+        self.assertFalse(seen['replica'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        # Клиент без cookie с токеном того же пользователя.
+        _, seen = self.request('get', self.token)
+        self.assertFalse(seen['replica'])
+        _, seen = self.request('get', self.other_token)
+        self.assertTrue(seen['replica'])
+
+    def test_failed_write_does_not_pin(self):
+        request = self.factory.post(
+            '/api/recipes/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        request.user = AnonymousUser()
+        ReplicaMiddleware(lambda request: HttpResponse(status=400))(request)
+        _, seen = self.request('get', self.token)
+        self.assertTrue(seen['replica'])
+
+    def test_primary_only_get_reads_primary_and_pins(self):
+        view = primary_only(use_replica.get)
+        response, seen = self.request('get', self.token, view=view)
+        self.assertTrue(seen['replica'])
+        self.assertFalse(seen['view_replica'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        _, seen = self.request('get', self.token)
+        self.assertFalse(seen['replica'])
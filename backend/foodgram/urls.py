@@ -1,3 +1,4 @@
+from api.metrics import metrics_view
 from api.views import redirect_short_link
 from django.conf import settings
 from django.conf.urls.static import static
@@ -7,6 +8,7 @@ from django.urls import include, path
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('metrics', metrics_view, name='metrics'),
     path('s/<str:short_link>/', redirect_short_link,
          name='redirect_short_link'),
 ]
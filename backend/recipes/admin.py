@@ -1,7 +1,12 @@
+from api.jobs import enqueue
+from api.shopping_cart import recipe_amounts, update_carted_recipe
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.safestring import mark_safe
+from foodgram.paginator import EstimatedCountPaginator
 
-from .models import (FavoriteRecipe, Ingredient, Recipe, RecipeIngredient,
+from .models import (FavoriteRecipe, Ingredient, Job, Recipe, RecipeIngredient,
                      ShoppingCart, Tag)
 
 
@@ -15,14 +20,58 @@ class IngredientAdmin(admin.ModelAdmin):
 @admin.register(FavoriteRecipe)
 class FavoriteRecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe__author')
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    extra = 0
+    min_num = 1
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient')
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'author', 'image_tag', 'favorites_count')
+    list_select_related = ('author',)
     search_fields = ('name', 'author__username', 'author__email')
     list_filter = ('tags',)
     ordering = ('-id',)
+    autocomplete_fields = ('author',)
+    inlines = (RecipeIngredientInline,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """
+        Число добавлений в избранное - коррелированный подзапрос:
+        считается только для рецептов страницы, без JOIN и GROUP BY
+        по всей таблице избранного.
+        """
+        return super().get_queryset(request).annotate(
+            favorites_total=Coalesce(Subquery(
+                FavoriteRecipe.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    total=Count('id')).values('total')
+            ), 0))
+
+    def save_related(self, request, form, formsets, change):
+        """Ингредиенты из инлайна переносятся в списки покупок и индекс."""
+        recipe_id = form.instance.id
+        old_amounts = recipe_amounts(recipe_id) if change else {}
+        super().save_related(request, form, formsets, change)
+        update_carted_recipe(recipe_id, old_amounts)
+        enqueue('index_recipes', {'recipe_ids': [recipe_id]})
+        if 'image' in form.changed_data:
+            enqueue('process_recipe_image', {'recipe_id': recipe_id})
 
     def image_tag(self, obj):
         if obj.image:
@@ -32,20 +81,42 @@ class RecipeAdmin(admin.ModelAdmin):
 
     image_tag.short_description = 'Фото рецепта'
 
-    @admin.display(description='Количество рецептов в избранном')
+    @admin.display(description='Количество рецептов в избранном',
+                   ordering='favorites_total')
     def favorites_count(self, obj):
         """Возвращает количество добавлений рецепта в избранное."""
-        return obj.users_recipes.count()
+        return obj.favorites_total
 
 
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
+    """
+    Только просмотр: ингредиенты меняются в рецепте, где изменения
+    переносятся в списки покупок и индексы (RecipeAdmin.save_related).
+    """
+
     list_display = ('id', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe__author', 'ingredient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe__author')
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Tag)
@@ -53,3 +124,13 @@ class TagAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'slug')
     search_fields = ('name', 'slug')
     ordering = ('name',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'queue', 'status', 'priority', 'attempts',
+                    'created_at', 'finished_at')
+    list_filter = ('status', 'queue', 'name')
+    readonly_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
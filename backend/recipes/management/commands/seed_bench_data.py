@@ -0,0 +1,211 @@
+import random
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from users.models import Follower, User
+
+USERNAME_PREFIX = 'bench_user_'
+BENCH_TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+    ('Десерт', 'dessert'),
+    ('Выпечка', 'bakery'),
+    ('Вегетарианское', 'vegetarian'),
+    ('Быстро', 'quick'),
+    ('Праздничное', 'holiday'),
+)
+AMOUNTS = (1, 2, 3, 5, 10, 20, 50, 100, 150, 200, 250, 300, 500, 1000)
+
+
+def zipf_cum_weights(size, exponent=1.1):
+    """Накопленные веса распределения Ципфа для size элементов."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, size + 1)))
+
+
+def chunked(iterable, size):
+    """Разбивает итерируемый объект на списки длиной size."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+
+    help = ("Заполняет БД синтетическими данными для нагрузочного "
+            "тестирования. Результат детерминирован значением --seed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Среднее число подписок на пользователя.')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Среднее число избранных на пользователя.')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Среднее число рецептов в корзине.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить ранее созданные данные.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(
+                username__startswith=USERNAME_PREFIX).delete()
+            self.stdout.write(f'Удалено объектов: {deleted}')
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError(
+                'Данные уже созданы, используйте --clear для пересоздания.')
+
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients_csv')
+        self.ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True))
+        self.ingredient_weights = zipf_cum_weights(len(self.ingredient_ids))
+        self.tag_ids = self.create_tags()
+
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(user_ids, options['recipes'])
+        self.create_follows(user_ids, options['follows'])
+        self.create_relations(FavoriteRecipe, user_ids, recipe_ids,
+                              options['favorites'])
+        self.create_relations(ShoppingCart, user_ids, recipe_ids,
+                              options['carts'])
+        # bulk_create не вызывает сигналы и сериализаторы, производные
+        # таблицы пересчитываются отдельно.
+        call_command('rebuild_shopping_lists')
+        call_command('build_similarity_index')
+        call_command('rebuild_feeds')
+        call_command('decay_popularity', rebuild=True)
+        self.stdout.write(self.style.SUCCESS('Данные созданы.'))
+
+    def bulk_insert(self, model, objects):
+        """Вставляет объекты порциями, не накапливая их в памяти."""
+        total = 0
+        for chunk in chunked(objects, self.batch_size):
+            model.objects.bulk_create(chunk)
+            total += len(chunk)
+        self.stdout.write(f'{model.__name__}: {total}')
+
+    def create_tags(self):
+        existing = set(Tag.objects.values_list('slug', flat=True))
+        Tag.objects.bulk_create(
+            Tag(name=name, slug=slug) for name, slug in BENCH_TAGS
+            if slug not in existing
+        )
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def create_users(self, count):
+        password = make_password('bench-password')
+        self.bulk_insert(User, (
+            User(
+                username=f'{USERNAME_PREFIX}{index}',
+                email=f'{USERNAME_PREFIX}{index}@bench.local',
+                first_name=f'Имя{index}',
+                last_name=f'Фамилия{index}',
+                password=password,
+            )
+            for index in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).order_by('id').values_list('id', flat=True))
+
+    def random_ingredients(self):
+        """Набор уникальных ингредиентов: популярные встречаются чаще."""
+        size = max(1, min(25, round(self.rng.gauss(8, 3))))
+        chosen = set()
+        while len(chosen) < size:
+            chosen.update(self.rng.choices(
+                self.ingredient_ids, cum_weights=self.ingredient_weights,
+                k=size - len(chosen)))
+        return chosen
+
+    def create_recipes(self, user_ids, count):
+        author_weights = zipf_cum_weights(len(user_ids), exponent=0.8)
+        tag_relation = Recipe.tags.through
+        created = 0
+        for chunk in chunked(range(count), self.batch_size):
+            authors = self.rng.choices(
+                user_ids, cum_weights=author_weights, k=len(chunk))
+            with transaction.atomic():
+                recipes = Recipe.objects.bulk_create(
+                    Recipe(
+                        author_id=author_id,
+                        name=f'Рецепт {index}',
+                        image='recipes/bench.png',
+                        text=f'Описание рецепта {index}.',
+                        cooking_time=self.rng.randint(5, 180),
+                    )
+                    for index, author_id in zip(chunk, authors)
+                )
+                if any(recipe.pk is None for recipe in recipes):
+                    raise CommandError(
+                        'СУБД не возвращает id при bulk_create.')
+                RecipeIngredient.objects.bulk_create(
+                    RecipeIngredient(
+                        recipe_id=recipe.pk,
+                        ingredient_id=ingredient_id,
+                        amount=self.rng.choice(AMOUNTS),
+                    )
+                    for recipe in recipes
+                    for ingredient_id in sorted(self.random_ingredients())
+                )
+                tag_relation.objects.bulk_create(
+                    tag_relation(recipe_id=recipe.pk, tag_id=tag_id)
+                    for recipe in recipes
+                    for tag_id in self.rng.sample(
+                        self.tag_ids,
+                        min(len(self.tag_ids), self.rng.randint(1, 3)))
+                )
+            created += len(recipes)
+        self.stdout.write(f'Recipe: {created}')
+        return list(Recipe.objects.filter(
+            author__username__startswith=USERNAME_PREFIX
+        ).order_by('id').values_list('id', flat=True))
+
+    def sample_targets(self, population, cum_weights, average, exclude=None):
+        """Уникальная выборка объектов с учетом популярности."""
+        size = min(len(population) - 1,
+                   max(0, round(self.rng.expovariate(1 / average))))
+        chosen = set()
+        attempts = 0
+        while len(chosen) < size and attempts < 10:
+            chosen.update(self.rng.choices(
+                population, cum_weights=cum_weights, k=size - len(chosen)))
+            chosen.discard(exclude)
+            attempts += 1
+        return sorted(chosen)
+
+    def create_follows(self, user_ids, average):
+        if not average or len(user_ids) < 2:
+            return
+        weights = zipf_cum_weights(len(user_ids), exponent=0.8)
+        self.bulk_insert(Follower, (
+            Follower(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in self.sample_targets(
+                user_ids, weights, average, exclude=user_id)
+        ))
+
+    def create_relations(self, model, user_ids, recipe_ids, average):
+        if not average or not recipe_ids:
+            return
+        weights = zipf_cum_weights(len(recipe_ids))
+        self.bulk_insert(model, (
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id in user_ids
+            for recipe_id in self.sample_targets(recipe_ids, weights, average)
+        ))
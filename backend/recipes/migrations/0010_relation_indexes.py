@@ -0,0 +1,48 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:48
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Удаляет дубликаты перед созданием уникальных ограничений."""
+    for model_name, fields in (
+        ('FavoriteRecipe', ('user', 'recipe')),
+        ('ShoppingCart', ('user', 'recipe')),
+        ('RecipeIngredient', ('recipe', 'ingredient')),
+    ):
+        model = apps.get_model('recipes', model_name)
+        duplicates = model.objects.values(*fields).annotate(
+            total=Count('id'), keep_id=Min('id')
+        ).filter(total__gt=1)
+        for duplicate in duplicates.iterator():
+            model.objects.filter(
+                **{field: duplicate[field] for field in fields}
+            ).exclude(id=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_alter_shortlink_short_link'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='favoriterecipe',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='favorite_user_recipe_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), include=('amount',), name='recipe_ingredient_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='shopping_cart_user_recipe_unique'),
+        ),
+    ]
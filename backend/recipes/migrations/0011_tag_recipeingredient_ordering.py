@@ -0,0 +1,21 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_relation_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipeingredient',
+            options={'ordering': ('id',), 'verbose_name': 'Ингредиент', 'verbose_name_plural': 'Количество ингредиентов в рецепте'},
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'ordering': ('id',), 'verbose_name': ('Тег',), 'verbose_name_plural': 'Теги'},
+        ),
+    ]
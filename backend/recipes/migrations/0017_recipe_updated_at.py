@@ -0,0 +1,27 @@
+# Generated by Django 4.2.14 on 2026-10-19 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipe_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='recipechange',
+            name='deleted',
+            field=models.BooleanField(default=False, verbose_name='Рецепт удален'),
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(condition=models.Q(('deleted', True)), fields=['id'], name='recipe_change_deleted_idx'),
+        ),
+    ]
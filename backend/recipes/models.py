@@ -58,6 +58,7 @@ class Tag(models.Model):
     class Meta:
         verbose_name = 'Тег',
         verbose_name_plural = 'Теги'
+        ordering = ('id',)
 
     def __str__(self):
         return self.name
@@ -120,10 +121,30 @@ class Recipe(models.Model):
         null=False,
     )
 
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+
+    popularity = models.FloatField(
+        verbose_name='Популярность',
+        help_text='Затухающая со временем сумма добавлений '
+                  'в избранное и корзину',
+        default=0,
+        editable=False,
+    )
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-id']
+        indexes = (
+            models.Index(fields=('author', '-id'),
+                         name='recipe_author_id_idx'),
+            models.Index(fields=('-popularity', '-id'),
+                         name='recipe_popularity_idx'),
+        )
 
     def __str__(self):
         return f"Рецепт: {self.name}. Автор: {self.author.username}"
@@ -146,10 +167,18 @@ class FavoriteRecipe(models.Model):
         related_name='users_recipes',
         verbose_name='Рецепт',
     )
+    # Вклад в популярность затухает со временем добавления.
+    created_at = models.DateTimeField('Время добавления', auto_now_add=True)
 
     class Meta:
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='favorite_user_recipe_unique'
+            ),
+        )
 
     def __str__(self):
         return f'{self.user.username} добавил {self.recipe.name} в избраннное'
@@ -172,10 +201,18 @@ class ShoppingCart(models.Model):
         related_name='in_shopping_carts',
         verbose_name='Рецепт'
     )
+    # Вклад в популярность затухает со временем добавления.
+    created_at = models.DateTimeField('Время добавления', auto_now_add=True)
 
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='shopping_cart_user_recipe_unique'
+            ),
+        )
 
     def __str__(self):
         return (f'{self.user.username} добавил'
@@ -206,11 +243,220 @@ class RecipeIngredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Количество ингредиентов в рецепте'
+        ordering = ('id',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                include=('amount',),
+                name='recipe_ingredient_unique'
+            ),
+        )
 
     def __str__(self):
         return f'{self.recipe.name} - {self.ingredient.name} ({self.amount})'
 
 
+class ShoppingListIngredient(models.Model):
+    """
+    Суммарное количество ингредиента в корзине пользователя.
+    Обновляется при изменении корзины и ингредиентов рецептов в ней.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField('Количество')
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списков покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='shopping_list_user_ingredient_unique'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.ingredient_id} ({self.total_amount})'
+
+
+class RecipeSignature(models.Model):
+    """MinHash-сигнатура множества ингредиентов и тегов рецепта."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Рецепт'
+    )
+    signature = models.BinaryField('Сигнатура')
+
+    class Meta:
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+    def __str__(self):
+        return f'Сигнатура рецепта {self.recipe_id}'
+
+
+class RecipeBucket(models.Model):
+    """Корзина LSH: рецепты с совпадающей полосой сигнатуры."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similarity_buckets',
+        verbose_name='Рецепт'
+    )
+    bucket = models.BigIntegerField('Хэш полосы')
+
+    class Meta:
+        verbose_name = 'Корзина LSH'
+        verbose_name_plural = 'Корзины LSH'
+        indexes = (
+            models.Index(fields=('bucket', 'recipe'),
+                         name='recipe_bucket_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.bucket}'
+
+
+class RecipeChange(models.Model):
+    """
+    Журнал изменений рецептов. По нему воркеры обновляют
+    индексы рецептов в памяти процесса.
+    """
+
+    recipe_id = models.BigIntegerField('Id рецепта')
+    deleted = models.BooleanField('Рецепт удален', default=False)
+    created_at = models.DateTimeField('Время изменения', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Изменения рецептов'
+        indexes = (
+            models.Index(fields=('id',), condition=models.Q(deleted=True),
+                         name='recipe_change_deleted_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.created_at}'
+
+
+class FeedEntry(models.Model):
+    """
+    Рецепт в ленте подписчика. Записывается при публикации рецепта
+    для авторов, у которых не слишком много подписчиков.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='feed_entry_user_recipe_unique'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('user', 'author'),
+                         name='feed_entry_user_author_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.recipe_id}'
+
+
+class Job(models.Model):
+    """
+    Фоновая задача очереди api.jobs. Выполняется командой run_worker.
+    Взятая воркером задача невидима до available_at (visibility timeout):
+    если воркер упал, задачу возьмет другой.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=100)
+    queue = models.CharField('Очередь', max_length=50, default='default')
+    payload = models.JSONField('Параметры', default=dict)
+    priority = models.SmallIntegerField('Приоритет', default=0)
+    status = models.CharField('Статус', max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    available_at = models.DateTimeField('Доступна с')
+    locked_by = models.CharField(max_length=100, blank=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Пользователь'
+    )
+    result = models.JSONField('Результат', null=True, blank=True)
+    last_error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = (
+            models.Index(
+                fields=('queue', '-priority', 'available_at'),
+                condition=models.Q(status__in=('queued', 'running')),
+                name='job_pending_idx'
+            ),
+            models.Index(fields=('finished_at',),
+                         condition=models.Q(status__in=('done', 'failed')),
+                         name='job_finished_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
+
+
 class ShortLink(models.Model):
     """Модель для хранения коротких ссылок на рецепты."""
 
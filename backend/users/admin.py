@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.utils.safestring import mark_safe
+from foodgram.paginator import EstimatedCountPaginator
 
 from .models import Follower, User
 
@@ -10,6 +11,8 @@ class UserAdmin(admin.ModelAdmin):
                     'last_name', 'avatar_tag')
     list_filter = ('email', 'username',)
     search_fields = ('email', 'username', 'first_name', 'last_name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def avatar_tag(self, obj):
         if obj.avatar:
@@ -22,5 +25,8 @@ class UserAdmin(admin.ModelAdmin):
 @admin.register(Follower)
 class FollowerAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'author',)
-    list_filter = ('user', 'author',)
-    search_fields = ('user', 'author',)
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username',)
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_alter_user_avatar'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follower',
+            index=models.Index(fields=['author', 'user'], name='follower_author_user_idx'),
+        ),
+    ]
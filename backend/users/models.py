@@ -80,6 +80,10 @@ class Follower(models.Model):
                 name='user_author_unique'
             ),
         )
+        indexes = (
+            models.Index(fields=('author', 'user'),
+                         name='follower_author_user_idx'),
+        )
 
     def __str__(self):
         return f'{self.user.username} подписан на {self.author.username}'
@@ -0,0 +1,299 @@
+"""
+Нагрузочный прогон API по postman-коллекции или журналу запросов.
+
+Источники запросов:
+  * foodgram.postman_collection.json — берутся запросы коллекции
+    (папки *_bad_requests пропускаются, если не указан --include-bad);
+  * файл *.jsonl — по одному запросу в строке:
+    {"method": "GET", "path": "/api/recipes/?limit=6",
+     "body": null, "auth": false}
+
+Переменные {{...}} подставляются из коллекции и параметров --var.
+Неизвестные переменные с суффиксом Id заполняются случайным
+значением из --id-range, с суффиксом Token — случайным токеном
+из --tokens. Авторизованные запросы выполняются
+виртуальными пользователями с токенами из --tokens.
+
+Пример:
+  python load_replay.py foodgram.postman_collection.json \\
+      --base-url http://127.0.0.1:8000 --concurrency 16 --duration 60 \\
+      --tokens tokens.txt --auth-share 0.3 --id-range 1-20000
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+
+VARIABLE_RE = re.compile(r'\{\{(\w+)\}\}')
+NUMBER_SEGMENT_RE = re.compile(r'/\d+(?=/|$)')
+
+
+@dataclass
+class RequestShape:
+    """Шаблон запроса для повторения."""
+
+    name: str
+    method: str
+    path: str
+    body: Optional[str]
+    auth: bool
+
+
+def endpoint_key(method, path):
+    """Ключ для группировки статистики: метод и путь без id и query."""
+    path = NUMBER_SEGMENT_RE.sub('/{id}', path.split('?', 1)[0])
+    path = VARIABLE_RE.sub(
+        lambda match: ('{id}' if match.group(1).endswith('Id')
+                       else '{%s}' % match.group(1)), path)
+    return f'{method} {path}'
+
+
+def load_postman(path, include_bad):
+    with open(path, encoding='utf-8') as file:
+        collection = json.load(file)
+    variables = {
+        item['key']: item['value'] for item in collection.get('variable', [])
+    }
+    shapes = []
+
+    def walk(items, auth, folder):
+        for item in items:
+            item_auth = item.get('auth', auth)
+            if 'item' in item:
+                if not include_bad and item['name'].endswith('_bad_requests'):
+                    continue
+                walk(item['item'], item_auth, item['name'])
+                continue
+            request = item['request']
+            request_auth = request.get('auth', item_auth) or {}
+            url = request['url']
+            raw_url = url['raw'] if isinstance(url, dict) else url
+            body = request.get('body', {})
+            headers = {header['key'] for header in request.get('header', [])}
+            shapes.append(RequestShape(
+                name=f'{folder}/{item["name"]}',
+                method=request['method'],
+                path=raw_url.replace('{{baseUrl}}', ''),
+                body=body.get('raw') if body.get('mode') == 'raw' else None,
+                auth=(request_auth.get('type') not in (None, 'noauth')
+                      or 'Authorization' in headers),
+            ))
+
+    walk(collection['item'], collection.get('auth'), '')
+    return shapes, variables
+
+
+def load_jsonl(path):
+    shapes = []
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            body = record.get('body')
+            if body is not None and not isinstance(body, str):
+                body = json.dumps(body, ensure_ascii=False)
+            shapes.append(RequestShape(
+                name=f'line {number}',
+                method=record.get('method', 'GET').upper(),
+                path=record['path'],
+                body=body,
+                auth=bool(record.get('auth')),
+            ))
+    return shapes, {}
+
+
+class Substitutor:
+    """Подставляет значения переменных в путь и тело запроса."""
+
+    def __init__(self, variables, id_range, tokens):
+        self.variables = variables
+        self.id_range = id_range
+        self.tokens = tokens
+
+    def resolvable_name(self, name):
+        return (name in self.variables
+                or (name.endswith('Id') and self.id_range is not None)
+                or (name.endswith('Token') and bool(self.tokens)))
+
+    def resolvable(self, shape):
+        names = VARIABLE_RE.findall(f'{shape.path}{shape.body or ""}')
+        return all(self.resolvable_name(name) for name in names)
+
+    def __call__(self, text, rng):
+        def replace(match):
+            name = match.group(1)
+            if name in self.variables:
+                return str(self.variables[name])
+            if not self.resolvable_name(name):
+                raise KeyError(f'Нет значения для переменной {name}.')
+            if name.endswith('Token'):
+                return rng.choice(self.tokens)
+            return str(rng.randint(*self.id_range))
+        return VARIABLE_RE.sub(replace, text)
+
+
+class Stats:
+    """Потокобезопасный сбор задержек по эндпоинтам."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, key, latency, status):
+        with self.lock:
+            self.latencies[key].append(latency)
+            self.statuses[key][status] += 1
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def virtual_user(number, shapes, substitutor, options, stats, deadline):
+    rng = random.Random(options.seed + number)
+    session = requests.Session()
+    token = None
+    if options.tokens and rng.random() < options.auth_share:
+        token = rng.choice(options.tokens)
+    candidates = [shape for shape in shapes if token or not shape.auth]
+    if not candidates:
+        return
+    sent = 0
+    while time.monotonic() < deadline and (
+            not options.requests_per_user or sent < options.requests_per_user):
+        shape = rng.choice(candidates)
+        headers = {'Content-Type': 'application/json'}
+        if shape.auth:
+            headers['Authorization'] = f'Token {token}'
+        path = substitutor(shape.path, rng)
+        body = substitutor(shape.body, rng) if shape.body else None
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                shape.method, options.base_url + path, data=body,
+                headers=headers, timeout=options.timeout)
+            status = response.status_code
+        except requests.RequestException:
+            status = 'error'
+        stats.add(endpoint_key(shape.method, shape.path),
+                  time.perf_counter() - start, status)
+        sent += 1
+        if options.think_time:
+            time.sleep(rng.uniform(0, options.think_time))
+
+
+def print_report(stats, elapsed):
+    total = sum(len(values) for values in stats.latencies.values())
+    print(f'Всего запросов: {total}, {total / elapsed:.1f} rps '
+          f'за {elapsed:.1f} с')
+    header = (f'{"endpoint":<55} {"count":>7} {"rps":>7} {"p50":>8} '
+              f'{"p95":>8} {"p99":>8}  statuses')
+    print(header)
+    report = {}
+    for key in sorted(stats.latencies):
+        values = stats.latencies[key]
+        row = {
+            'count': len(values),
+            'rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+            'statuses': {str(status): count
+                         for status, count in stats.statuses[key].items()},
+        }
+        report[key] = row
+        print(f'{key:<55} {row["count"]:>7} {row["rps"]:>7} '
+              f'{row["p50_ms"]:>8} {row["p95_ms"]:>8} {row["p99_ms"]:>8}  '
+              f'{row["statuses"]}')
+    return {'elapsed_s': round(elapsed, 2), 'total': total,
+            'rps': round(total / elapsed, 2), 'endpoints': report}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('source',
+                        help='postman-коллекция (.json) или журнал (.jsonl)')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30,
+                        help='Длительность прогона в секундах.')
+    parser.add_argument('--requests-per-user', type=int, default=0)
+    parser.add_argument('--methods', default='GET',
+                        help='Методы через запятую, например GET,POST.')
+    parser.add_argument('--include-bad', action='store_true')
+    parser.add_argument('--var', action='append', default=[],
+                        help='Переменная коллекции в виде name=value.')
+    parser.add_argument('--id-range', default='',
+                        help='Диапазон случайных id, например 1-1000.')
+    parser.add_argument('--tokens',
+                        help='Файл с токенами пользователей по одному '
+                             'в строке.')
+    parser.add_argument('--auth-share', type=float, default=0.5,
+                        help='Доля авторизованных виртуальных пользователей.')
+    parser.add_argument('--think-time', type=float, default=0)
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Файл для сохранения отчета JSON.')
+    return parser.parse_args()
+
+
+def main():
+    options = parse_args()
+    if options.source.endswith('.jsonl'):
+        shapes, variables = load_jsonl(options.source)
+    else:
+        shapes, variables = load_postman(options.source, options.include_bad)
+    for item in options.var:
+        name, _, value = item.partition('=')
+        variables[name] = value
+    id_range = None
+    if options.id_range:
+        low, _, high = options.id_range.partition('-')
+        id_range = (int(low), int(high))
+    tokens = []
+    if options.tokens:
+        with open(options.tokens, encoding='utf-8') as file:
+            tokens = [line.strip() for line in file if line.strip()]
+    options.tokens = tokens
+    substitutor = Substitutor(variables, id_range, tokens)
+
+    methods = {method.strip().upper()
+               for method in options.methods.split(',')}
+    selected = [shape for shape in shapes
+                if shape.method in methods and substitutor.resolvable(shape)]
+    print(f'Запросов в источнике: {len(shapes)}, '
+          f'используется: {len(selected)}')
+    if not selected:
+        raise SystemExit('Нет запросов для прогона.')
+
+    stats = Stats()
+    start = time.monotonic()
+    deadline = start + options.duration
+    with ThreadPoolExecutor(max_workers=options.concurrency) as executor:
+        futures = [
+            executor.submit(virtual_user, number, selected, substitutor,
+                            options, stats, deadline)
+            for number in range(options.concurrency)
+        ]
+        for future in futures:
+            future.result()
+    report = print_report(stats, time.monotonic() - start)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()